@@ -0,0 +1,93 @@
+'''
+Compare the speed of getting and setting static properties and traits with
+plain Python properties.
+
+Run from the root of the repository::
+
+    PYTHONPATH=. python benchmarks/accessors.py [number]
+'''
+import sys
+import timeit
+
+from traity.events import init_events
+from traity.statics import vproperty
+from traity.traits import trait
+from traity.tools.initializable_property import init_properties
+
+
+class Plain(object):
+    def _get_x(self):
+        return self._x
+
+    def _set_x(self, value):
+        self._x = value
+
+    x = property(_get_x, _set_x)
+
+
+class PlainInt(object):
+    def _get_x(self):
+        return self._x
+
+    def _set_x(self, value):
+        if not isinstance(value, int):
+            raise ValueError(value)
+        self._x = int(value)
+
+    x = property(_get_x, _set_x)
+
+
+class Generic(object):
+    # Not initialized, so the accessors are not compiled
+    x = vproperty()
+
+
+@init_properties
+class Static(object):
+    x = vproperty()
+
+
+@init_properties
+class StaticInt(object):
+    x = vproperty(type=int, instance=int)
+
+
+@init_properties(slots=True)
+class SlottedInt(object):
+    x = vproperty(type=int, instance=int)
+
+
+@init_properties
+class Trait(object):
+    x = trait()
+
+
+@init_properties(slots=True)
+class SlottedTrait(object):
+    x = trait()
+
+
+def measure(obj, number):
+    obj.x = 1
+    get = min(timeit.repeat(lambda: obj.x, number=number, repeat=3))
+    set = min(timeit.repeat(lambda: setattr(obj, 'x', 1), number=number, repeat=3))
+    return get / number * 1e9, set / number * 1e9
+
+
+def main(number=200000):
+    cases = [('property', Plain), ('property with checks', PlainInt),
+             ('vproperty (not compiled)', Generic), ('vproperty', Static),
+             ('vproperty with checks', StaticInt),
+             ('slotted vproperty with checks', SlottedInt),
+             ('trait', Trait), ('slotted trait', SlottedTrait)]
+
+    print('%-30s %10s %10s' % ('', 'get (ns)', 'set (ns)'))
+    for name, cls in cases:
+        obj = cls()
+        if cls in (Trait, SlottedTrait):
+            init_events(obj)
+        print('%-30s %10.1f %10.1f' % ((name,) + measure(obj, number)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,55 @@
+'''
+Compare loading values into a population one member at a time with the
+vectorized bulk assignments.
+
+Run from the root of the repository::
+
+    PYTHONPATH=. python benchmarks/bulk.py [count]
+'''
+import sys
+import time
+
+import numpy
+
+from traity.columnar import Population
+from traity.statics import vproperty
+from traity.statics.validators import in_range
+from traity.tools.initializable_property import init_properties
+
+
+@init_properties
+class Row(object):
+    value = vproperty(type=int, instance=int)
+    level = vproperty(type=in_range(0, 100, dtype='uint8'))
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(count=1000000):
+    values = numpy.arange(count) % 100
+    rows = Population(Row, count)
+
+    def loop():
+        for index, value in enumerate(values.tolist()):
+            member = rows[index]
+            member.value = value
+            member.level = value
+
+    def columns():
+        rows.set_column('value', values)
+        rows.set_column('level', values)
+
+    def extend():
+        Population(Row).extend(value=values, level=values)
+
+    for name, function in [('one member at a time', loop),
+                           ('set_column', columns), ('extend', extend)]:
+        print('%-24s %8.3f s' % (name, timed(function)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,86 @@
+'''
+Report the memory used per object by the event system.
+
+Run from the root of the repository::
+
+    PYTHONPATH=. python benchmarks/memory.py [count]
+'''
+import sys
+import gc
+import tracemalloc
+
+from traity.events import init_events, events, connect
+from traity.traits import trait
+from traity.tools.initializable_property import init_properties
+
+
+@init_properties
+class Leaf(object):
+    x = trait()
+
+
+@init_properties(slots=True)
+class SlottedLeaf(object):
+    x = trait()
+
+
+def bytes_per_object(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def plain():
+    return Leaf()
+
+
+def initialized():
+    obj = Leaf()
+    init_events(obj)
+    return obj
+
+
+def listened():
+    obj = initialized()
+    events(obj).listen(('x', 'changed'), print)
+    return obj
+
+
+def slotted():
+    obj = SlottedLeaf()
+    init_events(obj)
+    obj.x = 1
+    return obj
+
+
+def unslotted():
+    obj = initialized()
+    obj.x = 1
+    return obj
+
+
+def connected_pair():
+    parent, child = initialized(), initialized()
+    connect(parent, child, 'child')
+    return parent, child
+
+
+def main(count=100000):
+    base = bytes_per_object(plain, count)
+    print('%-28s %8.1f bytes' % ('object without events', base))
+    for name, factory in [('initialized object', initialized),
+                          ('object with a listener', listened),
+                          ('connected pair', connected_pair),
+                          ('object with a value', unslotted),
+                          ('slotted object with a value', slotted)]:
+        size = bytes_per_object(factory, count)
+        print('%-28s %8.1f bytes (+%.1f)' % (name, size, size - base))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -23,8 +23,9 @@ setup(name='traity',
       author='Sean Ross-Ross',
       author_email='srossross@enthought.com',
       url='http://srossross.github.com/traity',
-      classifiers=['Programming Language :: Python :: 2',
-                   'Programming Language :: Python :: 3'],
+      classifiers=['Programming Language :: Python :: 3'],
+      python_requires='>=3.7',
+      extras_require={'columnar': ['numpy']},
       license='BSD',
       )
 
@@ -0,0 +1,315 @@
+#-------------------------------------------------------------------------------
+#
+#  Copyright (c) 2011, Enthought, Inc.
+#  All rights reserved.
+#
+#  This software is provided without warranty under the terms of the BSD
+#  license included in /LICENSE.txt and may be redistributed only
+#  under the conditions described in the aforementioned license.  The license
+#  is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+#  Thanks for using Enthought open source!
+#
+#  Author: Sean Ross-Ross
+#
+#-------------------------------------------------------------------------------
+'''
+============================
+Columnar storage
+============================
+
+A `Population` holds many objects of one class and stores their numeric
+properties in contiguous NumPy columns instead of one boxed value per
+object::
+
+    from traity.compat.has_traits import HasTraits
+    from traity.compat.trait_types import Int
+    from traity.traits import trait
+
+    class Particle(HasTraits):
+        mass = trait(type=float)
+        charge = Int()
+
+    particles = Population(Particle, 100000)
+
+    particles[0].mass = 2.0                 # validated and notified as usual
+    total = particles.column('mass').sum()  # vectorized read
+    particles.set_column('charge', 0)       # vectorized write, one event
+
+Members are proxies of a subclass of the class. Getting or setting a column
+property of a member reads or writes its row, through the property's usual
+validation and change notification. Members are created without calling
+the `__init__` method of the class.
+
+Requires NumPy.
+'''
+
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from traity.events import init_events, events, listenable
+from traity.statics import vproperty
+from traity.tools.initializable_property import init_properties
+from traity.statics.validators import Validator, DTYPES
+from traity.tools.specialize import unspecialized_class
+
+
+def _column_dtype(prop):
+    if prop._storage() is None:
+        return None
+    if isinstance(prop._plain_type, Validator):
+        return prop._plain_type.dtype
+    return DTYPES.get(prop._plain_type)
+
+
+def _column_dtypes(cls, dtypes):
+    columns = {}
+    for klass in reversed(cls.__mro__):
+        for name in vars(klass):
+            value = getattr(cls, name, None)
+            if isinstance(value, vproperty) and _column_dtype(value) is not None:
+                columns[name] = numpy.dtype(_column_dtype(value))
+
+    for name, dtype in (dtypes or {}).items():
+        if not isinstance(getattr(cls, name, None), vproperty):
+            raise ValueError('%r is not a static property of %r' % (name, cls))
+        columns[name] = numpy.dtype(dtype)
+    return columns
+
+
+def _column_default(prop):
+    if prop._default is None:
+        return 0
+    return prop._default(None)
+
+
+def _removed(instance):
+    raise ReferenceError('%s member was removed from its population'
+                         % (type(instance).__name__,))
+
+
+def _column_accessors(name):
+    def get(instance):
+        index = instance._index_
+        if index is None:
+            _removed(instance)
+        return instance._population_._columns[name].item(index)
+
+    def set(instance, value):
+        index = instance._index_
+        if index is None:
+            _removed(instance)
+        instance._population_._columns[name][index] = value
+
+    return get, set
+
+
+def _proxy_class(cls, columns):
+    slots = ('_population_', '_index_')
+    if not hasattr(cls, '__weakref__'):
+        slots += ('__weakref__',)
+    namespace = {'__slots__': slots, '__module__': cls.__module__}
+
+    for name in columns:
+        # An uninitialized copy of the property, stored in the column once the
+        # class is initialized. Static listeners are inherited from cls.
+        # (copy.copy would look __setstate__ up through delegation.)
+        original = getattr(cls, name)
+        prop = object.__new__(unspecialized_class(original))
+        prop.__dict__.update(original.__dict__)
+        prop._store_key = prop._attr = None
+        if isinstance(prop, listenable):
+            prop._listeners = {}
+        namespace[name] = prop
+
+    proxy = type(cls)(cls.__name__, (cls,), namespace)
+    proxy.__qualname__ = cls.__qualname__
+    if any(proxy.__dict__[name]._store_key is None for name in columns):
+        # The metaclass of cls does not initialize properties
+        init_properties(proxy)
+
+    # Properties may replace themselves when they are initialized
+    for name in columns:
+        prop = proxy.__dict__[name]
+        prop._getter, prop._setter = _column_accessors(name)
+        prop._recompile()
+    return proxy
+
+
+class Population(object):
+    '''
+    A growable collection of objects of class cls whose numeric static
+    properties and traits are stored in NumPy columns.
+
+    Properties with a `type` of int, float, bool or complex, or a validator
+    with a dtype (see `traity.statics.validators`), become columns. Their
+    defaults are evaluated once per column, with None as the instance.
+
+    Members are created on first access, without calling `cls.__init__`,
+    and are kept for as long as they are referenced. Members removed by
+    shrinking the population with :meth:`resize` raise ReferenceError when
+    their column properties are used.
+
+    Bulk writes with :meth:`set_column` trigger a single `(name, 'changed')`
+    event on the population, with the `old` and `new` values and the
+    `indices` written, instead of one event per member.
+
+    :param cls: class of the members.
+    :param size: initial number of members.
+    :param dtypes: dict of property names to NumPy dtypes, to add columns or
+                   override the type of a column.
+    '''
+    def __init__(self, cls, size=0, dtypes=None):
+        if numpy is None:
+            raise ImportError('Population requires numpy')
+
+        self.cls = cls
+        self.dtypes = _column_dtypes(cls, dtypes)
+        self.proxy_class = _proxy_class(cls, self.dtypes)
+
+        self._defaults = {name: _column_default(getattr(cls, name))
+                          for name in self.dtypes}
+        self._columns = {name: numpy.empty(0, dtype)
+                         for name, dtype in self.dtypes.items()}
+        self._capacity = 0
+        self._size = 0
+        self._members = weakref.WeakValueDictionary()
+
+        init_events(self)
+        self.resize(size)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self[index]
+
+    def __getitem__(self, index):
+        '''
+        Return the member at index. The same proxy is returned for as long
+        as it is referenced.
+        '''
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('population index out of range')
+
+        member = self._members.get(index)
+        if member is None:
+            member = object.__new__(self.proxy_class)
+            member._population_ = self
+            member._index_ = index
+            init_events(member)
+            self._members[index] = member
+        return member
+
+    def resize(self, size):
+        '''
+        Grow or shrink the population to size members. New members get the
+        column defaults. Removed members can no longer be used.
+        '''
+        if size > self._capacity:
+            capacity = max(size, 2 * self._capacity)
+            for name, column in self._columns.items():
+                grown = numpy.empty(capacity, column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+            self._capacity = capacity
+
+        if size > self._size:
+            for name, column in self._columns.items():
+                column[self._size:size] = self._defaults[name]
+        else:
+            for index, member in list(self._members.items()):
+                if index >= size:
+                    member._index_ = None
+                    del self._members[index]
+        self._size = size
+
+    def append(self, **values):
+        '''
+        Add a member, set the given properties and return it.
+        '''
+        index = self._size
+        self.resize(index + 1)
+        member = self[index]
+        for name, value in values.items():
+            setattr(member, name, value)
+        return member
+
+    def extend(self, **columns):
+        '''
+        Add members with the values of the given columns, eg. to load a
+        table::
+
+            particles.extend(mass=masses, charge=charges)
+
+        All columns are validated as arrays (see :meth:`set_column`) before
+        any member is added and must be one dimensional and of the same
+        length. Other columns get
+        their defaults. No events are triggered.
+
+        :raises ValueError: if any value is rejected.
+        '''
+        validated = {}
+        for name, values in columns.items():
+            if name not in self._columns:
+                raise ValueError('%r is not a column' % (name,))
+            values = numpy.asarray(getattr(self.cls, name)._validate_array(values))
+            if values.ndim != 1:
+                raise ValueError('Values of column %r must be one dimensional, not of shape %r'
+                                 % (name, values.shape))
+            validated[name] = values
+
+        lengths = set(len(values) for values in validated.values())
+        if len(lengths) > 1:
+            raise ValueError('Columns have different lengths %r' % sorted(lengths))
+        if not lengths:
+            return
+
+        start = self._size
+        self.resize(start + lengths.pop())
+        for name, values in validated.items():
+            self._columns[name][start:self._size] = values
+
+    def column(self, name):
+        '''
+        Return the values of property name of all members as an array.
+
+        The array is a view, writing to it does not validate the values or
+        notify listeners (see :meth:`set_column`). It is no longer used by
+        the population once the population grows.
+        '''
+        return self._columns[name][:self._size]
+
+    def set_column(self, name, values, indices=None):
+        '''
+        Set property name of the members at indices (all by default) and
+        trigger one `(name, 'changed')` event on the population if anybody
+        listens.
+
+        The values are validated as a whole by the `type` and `instance` of
+        the property (see `traity.statics.validators`).
+
+        :raises ValueError: if any value is rejected. Nothing is set then.
+        '''
+        column = self.column(name)
+        if indices is None:
+            indices = slice(None)
+
+        values = getattr(self.cls, name)._validate_array(values)
+
+        target = (name, 'changed')
+        snitch = events(self)
+        if not snitch.interested(target):
+            column[indices] = values
+            return
+
+        old = column[indices].copy()
+        column[indices] = values
+        snitch.etrigger(target, old=old, new=column[indices].copy(), indices=indices)
@@ -0,0 +1,194 @@
+#-------------------------------------------------------------------------------
+#
+#  Copyright (c) 2011, Enthought, Inc.
+#  All rights reserved.
+#
+#  This software is provided without warranty under the terms of the BSD
+#  license included in /LICENSE.txt and may be redistributed only
+#  under the conditions described in the aforementioned license.  The license
+#  is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+#  Thanks for using Enthought open source!
+#
+#  Author: Sean Ross-Ross
+#
+#-------------------------------------------------------------------------------
+
+import unittest
+from traity.columnar import Population, numpy
+from traity.events import events
+from traity.statics import vproperty
+from traity.statics.validators import in_range
+from traity.traits import trait, on_trait_change
+from traity.tools.initializable_property import init_properties
+from traity.compat.has_traits import HasTraits
+from traity.compat.trait_types import Int
+
+
+class Particle(HasTraits):
+    mass = trait(type=float, fdefault=lambda self: 1.0)
+    charge = Int()
+    name = trait()
+
+
+@init_properties
+class Cell(object):
+    alive = vproperty(type=bool)
+    age = vproperty(type=int, instance=int)
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class Test(unittest.TestCase):
+
+    def test_columns(self):
+        particles = Population(Particle, 3)
+        self.assertEqual(len(particles), 3)
+        self.assertEqual(sorted(particles.dtypes), ['charge', 'mass'])
+        self.assertEqual(particles.column('mass').dtype, numpy.float64)
+        self.assertEqual(list(particles.column('mass')), [1.0, 1.0, 1.0])
+        self.assertEqual(list(particles.column('charge')), [0, 0, 0])
+
+        cells = Population(Cell, 2)
+        self.assertEqual(cells.column('alive').dtype, numpy.bool_)
+        self.assertEqual(list(cells.column('age')), [0, 0])
+
+    def test_members(self):
+        particles = Population(Particle, 2)
+        first = particles[0]
+        self.assertIs(particles[0], first)
+        self.assertIs(particles[-2], first)
+        self.assertIsInstance(first, Particle)
+
+        first.mass = 3
+        self.assertEqual(first.mass, 3.0)
+        self.assertIs(type(first.mass), float)
+        self.assertEqual(list(particles.column('mass')), [3.0, 1.0])
+
+        # Non numeric traits are stored on the member as usual
+        first.name = 'electron'
+        self.assertEqual(first.name, 'electron')
+
+        with self.assertRaises(IndexError):
+            particles[2]
+
+        cell = Population(Cell, 1)[0]
+        with self.assertRaises(ValueError):
+            cell.age = 1.5
+
+    def test_member_events(self):
+        particles = Population(Particle, 2)
+        member = particles[1]
+        seen = []
+        events(member).listen(('charge', 'changed'), lambda event: seen.append(event.new))
+        member.charge = 2
+        particles[0].charge = 3
+        self.assertEqual(seen, [2])
+
+    def test_static_listeners(self):
+        seen = []
+
+        class Listened(HasTraits):
+            x = trait(type=float)
+
+            @on_trait_change('x')
+            def x_changed(self, event):
+                seen.append(event.new)
+
+        population = Population(Listened, 1)
+        population[0].x = 2.0
+        self.assertEqual(seen, [2.0])
+
+    def test_append_resize(self):
+        particles = Population(Particle)
+        for i in range(10):
+            particles.append(charge=i)
+        self.assertEqual(len(particles), 10)
+        self.assertEqual(list(particles.column('charge')), list(range(10)))
+        self.assertEqual(particles[9].mass, 1.0)
+
+        removed = particles[5]
+        particles.resize(4)
+        with self.assertRaises(ReferenceError):
+            removed.charge
+        with self.assertRaises(ReferenceError):
+            removed.charge = 1
+        self.assertEqual(len(particles), 4)
+        self.assertEqual(list(particles.column('charge')), [0, 1, 2, 3])
+        particles.resize(6)
+        self.assertEqual(list(particles.column('charge')), [0, 1, 2, 3, 0, 0])
+
+    def test_set_column(self):
+        particles = Population(Particle, 4)
+        seen = []
+        events(particles).listen(('mass', 'changed'), seen.append)
+
+        particles.set_column('mass', [1, 2, 3, 4])
+        self.assertEqual(list(particles.column('mass')), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(particles[3].mass, 4.0)
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(list(seen[0].old), [1.0] * 4)
+        self.assertEqual(list(seen[0].new), [1.0, 2.0, 3.0, 4.0])
+
+        particles.set_column('mass', 0, indices=[0, 2])
+        self.assertEqual(list(particles.column('mass')), [0.0, 2.0, 0.0, 4.0])
+        self.assertEqual(seen[1].indices, [0, 2])
+
+        # Nobody listens
+        particles.set_column('charge', [1, 1, 1, 1])
+        self.assertEqual(len(seen), 2)
+
+        cells = Population(Cell, 2)
+        with self.assertRaises(ValueError):
+            cells.set_column('age', [1.5, 2.5])
+        cells.set_column('age', [1, 2])
+        self.assertEqual(cells[1].age, 2)
+
+    def test_validators(self):
+
+        @init_properties
+        class Pixel(object):
+            level = vproperty(type=in_range(0, 255, dtype='uint8'))
+
+        pixels = Population(Pixel, 3)
+        self.assertEqual(pixels.column('level').dtype, numpy.uint8)
+        pixels.set_column('level', numpy.arange(3) * 100)
+        self.assertEqual(list(pixels.column('level')), [0, 100, 200])
+        with self.assertRaises(ValueError):
+            pixels.set_column('level', [1, 2, 300])
+        with self.assertRaises(ValueError):
+            pixels[0].level = 300
+        self.assertEqual(list(pixels.column('level')), [0, 100, 200])
+
+    def test_extend(self):
+        particles = Population(Particle, 1)
+        particles.extend(mass=numpy.arange(3), charge=[1, 2, 3])
+        self.assertEqual(len(particles), 4)
+        self.assertEqual(list(particles.column('mass')), [1.0, 0.0, 1.0, 2.0])
+        self.assertEqual(list(particles.column('charge')), [0, 1, 2, 3])
+
+        with self.assertRaises(ValueError):
+            particles.extend(mass=[1, 2], charge=[1])
+        with self.assertRaises(ValueError):
+            particles.extend(mass=[1], name=['x'])
+        with self.assertRaises(ValueError):
+            particles.extend(mass=numpy.ones((2, 2)))
+        with self.assertRaises(ValueError):
+            particles.extend(mass=5)
+        self.assertEqual(len(particles), 4)
+
+        cells = Population(Cell)
+        with self.assertRaises(ValueError):
+            cells.extend(alive=[True], age=[1.5])
+        self.assertEqual(len(cells), 0)
+        cells.extend(age=[1, 2])
+        self.assertEqual(list(cells.column('alive')), [False, False])
+
+    def test_dtypes(self):
+        particles = Population(Particle, 2, dtypes={'mass': 'float32'})
+        self.assertEqual(particles.column('mass').dtype, numpy.float32)
+        with self.assertRaises(ValueError):
+            Population(Particle, dtypes={'spin': 'int8'})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,19 +3,38 @@ Created on Oct 8, 2012
 
 @author: sean
 '''
-from traity.tools.initializable_property import init_properties
+from traity.tools.initializable_property import init_properties, property_slots
 from traity.events import init_events
 
     
 class HasTraitsMeta(type):
-    def __new__(cls, name, bases, dct):
+    '''
+    Initializes the properties of every class. Pass `slots=True` to store the
+    traits of a class in `__slots__`::
+    
+        class Point(HasTraits, slots=True):
+            x = trait()
+    '''
+    def __new__(cls, name, bases, dct, slots=False):
+        if slots:
+            dct = dict(dct)
+            dct['__slots__'] = property_slots(bases, dct)
         Klass = type.__new__(cls, name, bases, dct)
         init_properties(Klass)
         return Klass
      
-class HasTraits(object):
-    __metaclass__ = HasTraitsMeta
+class HasTraits(object, metaclass=HasTraitsMeta):
+    '''
+    Base class of objects with traits. Keyword arguments of the constructor 
+    are assigned to attributes.
+    
+    HasTraits itself has no `__dict__`, so that subclasses created with 
+    `slots=True` have none either. Other subclasses get one, instances of 
+    HasTraits itself can only be given their traits.
+    '''
+    __slots__ = ('__snitch__', '__weakref__')
    
     def __init__(self, **kwargs):
-        self.__dict__.update(kwargs)
         init_events(self)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
@@ -13,7 +13,7 @@
 #  Author: Sean Ross-Ross
 #
 #-------------------------------------------------------------------------------
-from traity.tools.weak_method import method_ref
+from traity.tools.weak_method import weak_callback
 
 '''
 =============
@@ -25,10 +25,13 @@ This is a **pure** event handling and propegation framework.
 '''
 
 import weakref
-import re
+import warnings
+import itertools
+import threading
+import contextvars
 from contextlib import contextmanager
-from types import MethodType
-from traity.tools.initializable_property import initializable
+from types import MethodType, MappingProxyType
+from traity.tools.initializable_property import initializable, class_finalizers
 
 class EventError(Exception):
     pass
@@ -52,6 +55,112 @@ def concat_targets(left, right):
     if not target:
         return None
     return target
+
+#: Every distinct target is given a small integer key the first time it is 
+#: seen. Listener tables, interest summaries and events use these keys so 
+#: that dispatch never hashes target tuples (or the trait objects inside them).
+#: Keys are cached in many places and are never released.
+#:
+#: The keys of tuple targets are the nodes of a trie of their segments read 
+#: from the end, so the key of an event bubbled upstream (its target with 
+#: segments prepended) is found without building the new target. Only 
+#: targets passed to `intern_target` and their suffixes are in the trie. The 
+#: targets of bubbled events that are not in it can not match any exact 
+#: listener, they have the key `_NO_KEY` and are not interned.
+_target_keys = {None: 0}
+#: The target of each key, None for keys of suffixes only
+_targets = [None]
+#: The first segment of the target of each key and the key of the rest
+_key_segments = [None]
+_key_suffixes = [None]
+#: Map (key, segment) to the key of segment prepended to the target of key
+_prepended = {}
+_intern_lock = threading.Lock()
+
+#: The key of bubbled events whose target was never interned
+_NO_KEY = -1
+
+#: A ResourceWarning is issued once when more targets than this are interned
+interned_targets_warning = 100000
+
+def _new_key(segment, suffix):
+    _targets.append(None)
+    _key_segments.append(segment)
+    _key_suffixes.append(suffix)
+    return len(_targets) - 1
+
+def intern_target(target):
+    '''
+    Return the integer key for target. Equal targets have the same key.
+    
+    Interned targets, and the objects in them, are kept for the life of the 
+    process. Targets should come from a bounded set, eg. trait names and 
+    event types. Put data that changes from event to event, such as indices 
+    or ids, in the event's keyword arguments, not in its target. 
+    '''
+    key = _target_keys.get(target)
+    if key is None:
+        with _intern_lock:
+            key = _target_keys.get(target)
+            if key is None:
+                size = len(_targets)
+                if isinstance(target, tuple) and target:
+                    key = 0
+                    for segment in reversed(target):
+                        suffix = key
+                        key = _prepended.get((suffix, segment))
+                        if key is None:
+                            key = _prepended[(suffix, segment)] = _new_key(segment, suffix)
+                else:
+                    key = _new_key(target, None)
+                _targets[key] = target
+                _target_keys[target] = key
+                if size <= interned_targets_warning < len(_targets):
+                    warnings.warn('%i event targets have been interned and are never '
+                                  'released; targets should come from a bounded set'
+                                  % len(_targets), ResourceWarning, stacklevel=2)
+    return key
+
+def _table_key(target):
+    '''
+    Key of target in a listener table. `None` is kept for catch-all listeners.
+    '''
+    if target is None:
+        return None
+    return intern_target(target)
+
+def _target_of(key):
+    '''
+    Return the target with key.
+    '''
+    target = _targets[key]
+    if target is None and key > 0:
+        segments = []
+        while key:
+            segments.append(_key_segments[key])
+            key = _key_suffixes[key]
+        target = tuple(segments)
+    return target
+
+def _concat_key(prefix_key, key):
+    '''
+    Return the key of `concat_targets(prefix, target)` given the keys of 
+    prefix and target, or `_NO_KEY` if that target is not interned. Nothing 
+    is interned.
+    '''
+    if key == _NO_KEY:
+        return _NO_KEY
+    if key and _key_suffixes[key] is None:
+        # Not a tuple, the same as the tuple of one segment
+        key = _prepended.get((0, _targets[key]), _NO_KEY)
+        if key == _NO_KEY:
+            return _NO_KEY
+    prefix = _targets[prefix_key]
+    for segment in (reversed(prefix) if isinstance(prefix, tuple) else (prefix,)):
+        key = _prepended.get((key, segment))
+        if key is None:
+            return _NO_KEY
+    return key
             
 class Event(object):
     '''
@@ -60,32 +169,91 @@ class Event(object):
     :param event_type: type of event
     :param target: 
     
-    
+    Keyword arguments are stored in a payload mapping that is shared (not 
+    copied) by every event bubbled from this one, and are available as 
+    attributes eg. `event.old`.
     '''
-    _GLOBAL_DISPATCH_ = []
+    __slots__ = ('snitch', '_key', '_target', '_prefix', '_parent', '_payload', 
+                 'stop', 'dispatcher', '__weakref__')
+    
     def __init__(self, snitch, target, dispatcher=None, **kwargs):
         self.snitch = snitch
+        self._key = intern_target(target)
         self._target = target
-        self.__dict__.update(kwargs)
-        self._kwargs = kwargs
+        self._prefix = None
+        self._parent = None
+        self._payload = kwargs
         self.stop = False
         self.dispatcher = dispatcher
     
+    @classmethod
+    def _acquire(cls, snitch, target, key, dispatcher, payload):
+        '''
+        Create an event for a target whose key is known, without copying the 
+        payload.
+        '''
+        event = cls.__new__(cls)
+        event.snitch = snitch
+        event._key = key
+        event._target = target
+        event._prefix = None
+        event._parent = None
+        event._payload = payload
+        event.stop = False
+        event.dispatcher = dispatcher
+        return event
+    
+    def __getattr__(self, attr):
+        if attr == '_payload':
+            raise AttributeError(attr)
+        try:
+            return self._payload[attr]
+        except KeyError:
+            raise AttributeError(attr)
+        
     @property
     def obj(self):
         return self.snitch._instance()
+    
     @property
     def target(self):
         '''
         The target this event will trigger action for.
         '''
+        if self._parent is not None:
+            # Walk the chain of bubbled events without recursion
+            prefixes = []
+            event = self
+            while event._parent is not None:
+                prefixes.append(event._prefix)
+                event = event._parent
+            prefixes.append(event.target)
+            
+            segments = []
+            for prefix in prefixes:
+                if isinstance(prefix, tuple):
+                    segments.extend(prefix)
+                elif prefix is not None:
+                    segments.append(prefix)
+            self._target = tuple(segments) or None
+            self._prefix = self._parent = None
+        elif self._target is None and self._key > 0:
+            self._target = _target_of(self._key)
         return self._target
     
+    def _identity(self):
+        '''
+        A hashable value equal for events of equal targets.
+        '''
+        if self._key == _NO_KEY:
+            return self.target
+        return self._key
+    
     
     def __eq__(self, other):
         if not isinstance(other, Event):
             return False
-        if self.target != other.target:
+        if self._identity() != other._identity():
             return False
         if self.snitch is not other.snitch:
             return False
@@ -93,18 +261,32 @@ class Event(object):
         return True
     
     def __hash__(self):
-        return hash(self.target) + 1
+        return hash((id(self.snitch), self._identity()))
         
     def __repr__(self):
-        return "Event(%(_target)r)" % self.__dict__
+        return "Event(%r)" % (self.target,)
         
     def bubble_target(self, snitch, target):
         '''
         returns a new event with target prepended to the list of targets.
+        
+        The new event shares this event's payload and only links to this 
+        event, the new target is not computed until it is needed.
         '''
-        target = concat_targets(target, self.target)
-        dispatcher = self.dispatcher
-        return Event(snitch, target, dispatcher, **self._kwargs)
+        return self._bubble(snitch, target, _table_key(target))
+    
+    def _bubble(self, snitch, target, target_key):
+        event = Event._acquire(snitch, None, self._key, self.dispatcher, self._payload)
+        if target is None:
+            event._target = self._target
+            event._prefix = self._prefix
+            event._parent = self._parent
+        else:
+            event._key = _concat_key(target_key, self._key)
+            if event._key == _NO_KEY:
+                event._prefix = target
+                event._parent = self
+        return event
     
     def dispatch(self, listener):
         '''
@@ -112,26 +294,222 @@ class Event(object):
         '''
         if self.dispatcher:
             self.dispatcher(self, listener)
-        elif self.snitch._dispatch_stack_:
-            self.snitch._dispatch_stack_[-1](self, listener)
+            return
+        
+        # The most recently added of the object's and the global dispatchers wins
+        local = self.snitch._dispatch_stack
+        glbl = _global_dispatchers.get()
+        if local:
+            top = local[-1]
+            if glbl and glbl[-1][0] > top[0]:
+                top = glbl[-1]
+            top[1](self, listener)
+        elif glbl:
+            glbl[-1][1](self, listener)
         else:
             listener(self)
+
+def _add_to_table(table, target, ref):
+    '''
+    Replace the listener snapshot for target with a new tuple including ref.
+    '''
+    table[target] = table.get(target, ()) + (ref,)
+
+def _matches(ref, listener):
+    return ref is listener or ref == listener
+
+def _remove_from_table(table, target, listener):
+    '''
+    Replace the listener snapshot for target with a new tuple without the first
+    occurrence of listener. 
+    '''
+    callbacks = table.get(target, ())
+    for idx, ref in enumerate(callbacks):
+        if _matches(ref, listener):
+            callbacks = callbacks[:idx] + callbacks[idx + 1:]
+            if callbacks:
+                table[target] = callbacks
+            else:
+                del table[target]
+            return
+
+def _purge_table(table):
+    '''
+    Rebuild all of the snapshots in table that contain dead weak references.
+    '''
+    for target, callbacks in list(table.items()):
+        alive = tuple(ref for ref in callbacks 
+                      if not isinstance(ref, weak_callback) or ref.alive)
+        if len(alive) == len(callbacks):
+            continue
+        if alive:
+            table[target] = alive
+        else:
+            del table[target]
+
+#: Target segment matching exactly one segment 
+ANY = '*'
+#: Target segment matching any number (including zero) of segments
+ANY_DEPTH = '**'
+
+def is_pattern(target):
+    '''
+    Return True if target is a tuple containing wildcard segments eg. 
+    `('child', '*', 'changed')` or `('**', 'changed')`.
+    '''
+    if type(target) is not tuple:
+        return False
+    for segment in target:
+        if isinstance(segment, str) and (segment == ANY or segment == ANY_DEPTH):
+            return True
+    return False
+
+class _PatternNode(object):
+    '''
+    Trie of target patterns keyed on target segments. Matching a target 
+    only follows the exact segment and the wildcard children at each level, 
+    so the cost does not depend on the number of patterns.
+    '''
+    __slots__ = ('children', 'listeners')
+    
+    def __init__(self):
+        self.children = {}
+        self.listeners = ()
+        
+    def _node(self, pattern, create=False):
+        node = self
+        for segment in pattern:
+            child = node.children.get(segment)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[segment] = _PatternNode()
+            node = child
+        return node
+        
+    def add(self, pattern, ref):
+        node = self._node(pattern, create=True)
+        node.listeners = node.listeners + (ref,)
+        
+    def remove(self, pattern, listener=None):
+        node = self._node(pattern)
+        if node is None:
+            return
+        if listener is None:
+            node.listeners = ()
+        else:
+            table = {None: node.listeners}
+            _remove_from_table(table, None, listener)
+            node.listeners = table.get(None, ())
+            
+    def match(self, target):
+        '''
+        Return the listener tuples of every pattern matching target.
+        '''
+        if target is None:
+            return []
+        size = len(target)
+        matches = []
+        matched = set()
+        seen = set()
+        todo = [(self, 0)]
+        while todo:
+            node, idx = todo.pop()
+            if (id(node), idx) in seen:
+                continue
+            seen.add((id(node), idx))
+            
+            children = node.children
+            any_depth = children.get(ANY_DEPTH)
+            if any_depth is not None:
+                for end in range(size, idx - 1, -1):
+                    todo.append((any_depth, end))
+            
+            if idx == size:
+                if node.listeners and id(node) not in matched:
+                    matched.add(id(node))
+                    matches.append(node.listeners)
+                continue
+            
+            child = children.get(ANY)
+            if child is not None:
+                todo.append((child, idx + 1))
+            child = children.get(target[idx])
+            if child is not None:
+                todo.append((child, idx + 1))
+        return matches
+    
+    def purge(self):
+        '''
+        Remove dead weak references and empty branches. Returns True if this 
+        node is empty.
+        '''
+        table = {None: self.listeners}
+        _purge_table(table)
+        self.listeners = table.get(None, ())
+        for segment, child in list(self.children.items()):
+            if child.purge():
+                del self.children[segment]
+        return not self.listeners and not self.children
+
+class _PatternIndex(object):
+    '''
+    A pattern trie and a cache of the matches for each target key.
+    '''
+    __slots__ = ('root', '_matches')
+    
+    def __init__(self):
+        self.root = _PatternNode()
+        self._matches = {}
+        
+    def __bool__(self):
+        return bool(self.root.children)
+    
+    def add(self, pattern, ref):
+        self.root.add(pattern, ref)
+        self._matches = {}
+        
+    def remove(self, pattern, listener=None):
+        self.root.remove(pattern, listener)
+        self._matches = {}
         
+    def match(self, key, event=None):
+        '''
+        Return the listener tuples of every pattern matching the target with 
+        key, or of event if key is `_NO_KEY`.
+        '''
+        if key == _NO_KEY:
+            return self.root.match(event.target)
+        matches = self._matches.get(key)
+        if matches is None:
+            matches = self._matches[key] = self.root.match(_target_of(key))
+        return matches
+    
+    def purge(self):
+        self.root.purge()
+        self._matches = {}
+
 def add_global_listener(listener, target=None):
     '''
     Add a listener to events on all objects.
+    
+    :param target: target tuple, may be a pattern (see :meth:`Snitch.listen`)
     '''
-    glbl = Snitch.global_listeners.setdefault(target, [])
-    glbl.append(listener)
+    if is_pattern(target):
+        Snitch.global_patterns.add(target, listener)
+    else:
+        _add_to_table(Snitch.global_listeners, _table_key(target), listener)
+    Snitch.listeners_changed()
     
 def remove_global_listener(listener, target=None):
     '''
     remove a add_global_listener
     '''
-
-    glbl = Snitch.global_listeners.setdefault(target, [])
-    if listener in glbl: 
-        glbl.remove(listener)
+    if is_pattern(target):
+        Snitch.global_patterns.remove(target, listener)
+    else:
+        _remove_from_table(Snitch.global_listeners, _table_key(target), listener)
+    Snitch.listeners_changed()
     
 @contextmanager
 def global_listener(listener, target=None):
@@ -154,23 +532,33 @@ def global_listener(listener, target=None):
     yield
     remove_global_listener(listener, target)
     
+#: The global dispatcher stack is an immutable tuple of `(sequence, dispatcher)` 
+#: pairs stored in a context variable. Every thread, and every asyncio task, 
+#: pushes and pops its own stack without locking or affecting the others. 
+_global_dispatchers = contextvars.ContextVar('traity_global_dispatchers', default=())
+
+def _dispatch_entry(dispatcher):
+    return (next(Snitch._dispatch_sequence_), dispatcher)
+
 def add_global_dispatcher(dispatcher):
     '''
     Add a dispatcher to the stack. 
     
+    The stack is local to the current thread or asyncio task.
+    
     :param dispatcher: callable object. signature must be `dispatcher(event, listener)`
     '''
-    Snitch._GLOBAL_DISPATCHERS_.append(dispatcher)
-    for snitch in Snitch.__instances__:
-        snitch._dispatch_stack_.append(dispatcher)
+    stack = _global_dispatchers.get()
+    _global_dispatchers.set(stack + (_dispatch_entry(dispatcher),))
 
 def pop_global_dispatcher():
     '''
     remove the last global disopatcher from the stack 
     '''
-    Snitch._GLOBAL_DISPATCHERS_.pop()
-    for snitch in Snitch.__instances__:
-        snitch._dispatch_stack_.pop()
+    stack = _global_dispatchers.get()
+    if not stack:
+        raise IndexError('pop from empty dispatcher stack')
+    _global_dispatchers.set(stack[:-1])
 
 def remove_global_dispatcher(dispatcher):
     '''
@@ -178,16 +566,11 @@ def remove_global_dispatcher(dispatcher):
      
     :param dispatcher: specific dispatcher to remove
     '''
-    for snitch in Snitch.__instances__:
-        dstack = snitch._dispatch_stack_
-        if dispatcher in dstack:
-            idx = dstack[::-1].index(dispatcher)
-            del dstack[len(dstack) - idx - 1]
-            
-    dstack = Snitch._GLOBAL_DISPATCHERS_
-    if dispatcher in dstack:
-        idx = dstack[::-1].index(dispatcher)
-        del dstack[len(dstack) - idx - 1]
+    stack = _global_dispatchers.get()
+    for idx in range(len(stack) - 1, -1, -1):
+        if stack[idx][1] == dispatcher:
+            _global_dispatchers.set(stack[:idx] + stack[idx + 1:])
+            return
             
 
 @contextmanager
@@ -203,8 +586,10 @@ def global_dispatcher(dispatcher):
     ok
     '''
     add_global_dispatcher(dispatcher)
-    yield
-    pop_global_dispatcher()
+    try:
+        yield
+    finally:
+        pop_global_dispatcher()
     
 @contextmanager
 def quiet():
@@ -213,8 +598,10 @@ def quiet():
     '''
     dispatcher = lambda event, listener: setattr(event, 'stop', True)
     add_global_dispatcher(dispatcher)
-    yield
-    pop_global_dispatcher()
+    try:
+        yield
+    finally:
+        pop_global_dispatcher()
 
 @contextmanager
 def queue():
@@ -232,11 +619,86 @@ def queue():
     todo = []
     dispatcher = lambda event, listener: todo.append((event, listener))
     add_global_dispatcher(dispatcher)
-    yield todo
-    pop_global_dispatcher()
+    try:
+        yield todo
+    finally:
+        pop_global_dispatcher()
+
+class Coalescer(object):
+    '''
+    Dispatcher that merges repeated events. Events are keyed on the 
+    object that triggered them, their target and the listener, and are 
+    delivered by :meth:`flush` in the order they were first seen. 
+    
+    When `changed` events are merged the delivered event has the `old` 
+    value of the first event and the `new` value of the last one.
+    
+    :param maxsize: if given, flush as soon as more than maxsize distinct 
+                    events are pending. 
+    '''
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        #: Number of events that were merged into a pending event.
+        self.merged = 0
+        self._pending = {}
+        self._flushing = None
+        
+    def __len__(self):
+        return len(self._pending)
+        
+    def __call__(self, event, listener):
+        if self._flushing is event:
+            # Delivering a pending event while still on the dispatcher stack
+            listener(event)
+            return
+        
+        key = (id(event.snitch), event._identity(), listener)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [event, listener, event]
+            if self.maxsize is not None and len(self._pending) > self.maxsize:
+                self.flush()
+        else:
+            pending[0] = event
+            self.merged += 1
+        
+    def flush(self, dispatch=None):
+        '''
+        Deliver all pending events.
+        
+        :param dispatch: function called with each event and listener. By 
+                         default pending events are passed directly to their 
+                         listeners.
+        '''
+        pending, self._pending = self._pending, {}
+        for event, listener, first in pending.values():
+            if first is not event:
+                event = _merge_events(first, event)
+            if dispatch is None:
+                self._flushing = event
+                try:
+                    event.dispatch(listener)
+                finally:
+                    self._flushing = None
+            else:
+                dispatch(event, listener)
+
+def _merge_events(first, last):
+    '''
+    Merge two `changed` events into one with the first old value.
+    '''
+    target = last.target
+    if not target or target[-1] != 'changed' or 'old' not in first._payload:
+        return last
+    payload = dict(last._payload)
+    payload['old'] = first._payload['old']
+    return Event._acquire(last.snitch, target, last._key, last.dispatcher, payload)
 
+def _dispatch(event, listener):
+    event.dispatch(listener)
+        
 @contextmanager
-def unique():
+def unique(maxsize=None):
     '''
     Only process unique events eg::
     
@@ -248,53 +710,206 @@ def unique():
         
         assert num_calls == 1 
     
-    and how
+    Events are merged by a :class:`Coalescer` and delivered when the block 
+    exits, or earlier if more than `maxsize` distinct events are pending.
     '''
-    todo = set()
-    dispatcher = lambda event, listener: todo.add((event, listener))
-    add_global_dispatcher(dispatcher)
-    yield
-    pop_global_dispatcher()
+    coalescer = Coalescer(maxsize)
+    add_global_dispatcher(coalescer)
+    try:
+        yield coalescer
+    finally:
+        remove_global_dispatcher(coalescer)
+    
+    coalescer.flush(_dispatch)
+
+
+
+class DedupeStats(object):
+    '''
+    Counts of the propagations done inside a `deduplicate` context. 
+    
+    :attr propagations: number of events bubbled to upstream nodes.
+    :attr avoided: number of deliveries to an upstream node that were 
+                   skipped because the event already reached that node with 
+                   the same target.
+    '''
+    def __init__(self):
+        self.propagations = 0
+        self.avoided = 0
+        
+    def __repr__(self):
+        return '<%s propagations=%i avoided=%i>' % (type(self).__name__, 
+                                                    self.propagations, self.avoided)
+
+_dedupe_stats = contextvars.ContextVar('traity_dedupe_stats', default=None)
+
+@contextmanager
+def deduplicate():
+    '''
+    Deliver each event to every upstream node at most once per target. 
+    
+    An ancestor reachable through several paths with the same target (e.g. 
+    a child connected to two parents that are connected to the same object 
+    with the same trait) normally gets the event once per path. Inside this 
+    context an event only reaches each `(upstream node, target)` pair once, 
+    and the upstream nodes of a skipped node are skipped too:: 
     
-    for event, listener in todo:
-        event.dispatch(listener)
+        with deduplicate() as stats:
+            obj.x = 1
+        
+        print stats.avoided
+    
+    '''
+    stats = DedupeStats()
+    token = _dedupe_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _dedupe_stats.reset(token)
+
+#: Shared empty containers of Snitches that have not needed their own yet
+_EMPTY = MappingProxyType({})
+_EMPTY_SET = frozenset()
+
+def class_listeners(cls):
+    '''
+    Return the static listeners of cls as a read-only mapping of target keys 
+    (see `intern_target`) to tuples of functions. 
+    
+    The table is built by `finalize_listeners` when the class is initialized 
+    with `init_properties`, or on first use for classes that never were. 
+    It is shared by all instances. 
+    '''
+    table = cls.__dict__.get('__listener_table__')
+    if table is None:
+        table = finalize_listeners(cls)
+    return table
+
+def finalize_listeners(cls):
+    '''
+    Merge the `__listeners__` declared by every class in the MRO of cls, base 
+    classes first, and freeze the result as `cls.__listener_table__`. 
+    '''
+    merged = {}
+    for base in reversed(cls.__mro__):
+        for target, functions in base.__dict__.get('__listeners__', {}).items():
+            merged.setdefault(_table_key(target), []).extend(functions)
+    
+    table = MappingProxyType({key: tuple(funcs) for key, funcs in merged.items() if funcs})
+    setattr(cls, '__listener_table__', table)
+    return table
 
+class_finalizers.append(finalize_listeners)
 
+def _stack_target(stack, target):
+    '''
+    Return the target reached through edge target from the top of the stack 
+    of `Snitch._compute_interest`.
+    '''
+    parts = [target]
+    for _, key, _, edge_target in reversed(stack):
+        if key != _NO_KEY:
+            parts.append(_target_of(key))
+            break
+        parts.append(edge_target)
+    
+    segments = []
+    for part in parts:
+        if isinstance(part, tuple):
+            segments.extend(part)
+        elif part is not None:
+            segments.append(part)
+    return tuple(segments) or None
+
+def _cache_interest(stack):
+    '''
+    Mark the nodes on the stack of `Snitch._compute_interest` interested.
+    '''
+    for node, key, _, _ in stack:
+        if key != _NO_KEY:
+            node._interest[key] = True
 
 class Snitch(object):
     '''
     Snitch object handles events. and propegates them to the object's upstream nodes.
+    
+    Snitches are slotted and share empty containers until they are first 
+    needed, so objects that never get listeners or connections stay small.
     '''
-    __instances__ = weakref.WeakSet()
-    _GLOBAL_DISPATCHERS_ = []
+    __slots__ = ('_instance', '_upstream', '_downstream', '_order', '_listeners', 
+                 '_patterns', '_static', '_interest', '_interest_generation', 
+                 '_dispatch_stack', '__weakref__')
+    
+    #: Dispatchers are stored as `(sequence, dispatcher)` pairs. There is one 
+    #: global stack per context (see `add_global_dispatcher`), and objects 
+    #: only get a stack of their own when a dispatcher is added to them. The 
+    #: sequence numbers decide which of the two stacks was added to last.
+    _dispatch_sequence_ = itertools.count()
     global_listeners = {}
+    global_patterns = _PatternIndex()
+    
+    #: Incremented whenever a listener or an upstream connection is added or 
+    #: removed anywhere. Invalidates the cached results of :meth:`interested`.
+    _generation_ = 0
+    
+    #: Incremented whenever the graph of upstream connections changes. 
+    #: Invalidates the memoized results of :func:`connected`.
+    _graph_generation_ = 0
+    _connected_memo_ = {}
+    _connected_memo_generation_ = 0
+    
+    #: New objects are given decreasing positions in the topological order. 
+    #: Objects are usually created before the children they are connected to, 
+    #: so most connections agree with the order without any reordering.
+    _order_counter_ = itertools.count(-1, -1)
+    #: Positions above every existing object, see `_maintain_order`
+    _top_order_counter_ = itertools.count(1)
+    
     def __init__(self, instance):
         self._instance = weakref.ref(instance)
 
-        self._upstream = weakref.WeakKeyDictionary()
-        
-        self._listeners = {}
-        cls = type(instance)
+        #: Tuple of `(weakref to upstream Snitch, target, target_key)` edges, 
+        #: replaced (never mutated) by add_upstream and remove_upstream.
+        self._upstream = ()
+        #: Replaced by a `WeakSet` of downstream Snitches on the first connection.
+        self._downstream = _EMPTY_SET
         
-        if hasattr(cls, '__listeners__'):
-            for key, listeners in instance.__listeners__.items():
-                ilisteners = self._listeners.setdefault(key, [])
-                for listener in listeners: 
-                    ilisteners.append(MethodType(listener, instance))
-                
-        self._dispatch_stack_ = list(self._GLOBAL_DISPATCHERS_)
-        self.__instances__.add(self)
+        #: Position in a topological order of the upstream graph. For every 
+        #: connection `node._order < upstream_node._order`.
+        self._order = next(Snitch._order_counter_)
         
+        #: Maps target keys (see `intern_target`) to immutable tuples of 
+        #: listeners. The tuples are replaced (never mutated) by listen and 
+        #: unlisten so that dispatch can iterate over them without any 
+        #: bookkeeping.
+        self._listeners = _EMPTY
+        self._patterns = None
+        self._interest = _EMPTY
+        self._interest_generation = -1
+        self._dispatch_stack = ()
         
+        #: Static listeners of the instance's class, shared by all instances 
+        #: (see `class_listeners`). They are bound to the instance only when 
+        #: an event is dispatched to them, so the Snitch never references the 
+        #: instance strongly.
+        self._static = class_listeners(type(instance))
+
     def add_dispatcher(self, dispatcher):
         '''
         
         :param dispatcher:
         '''
-        self._dispatch_stack_.append(dispatcher)
+        if not self._dispatch_stack:
+            self._dispatch_stack = []
+        self._dispatch_stack.append(_dispatch_entry(dispatcher))
 
     def pop_dispatcher(self):
-        self._dispatch_stack_.pop()
+        '''
+        Remove the last dispatcher added with `add_dispatcher`.
+        '''
+        if not self._dispatch_stack:
+            raise IndexError('pop from empty dispatcher stack')
+        self._dispatch_stack.pop()
         
     @contextmanager
     def quiet(self, stop=True):
@@ -303,8 +918,10 @@ class Snitch(object):
         '''
         dispatcher = lambda event, listener: setattr(event, 'stop', stop)
         self.add_dispatcher(dispatcher)
-        yield
-        self.pop_dispatcher()
+        try:
+            yield
+        finally:
+            self.pop_dispatcher()
         
     @contextmanager
     def queue(self):
@@ -314,124 +931,492 @@ class Snitch(object):
         todo = []
         dispatcher = lambda event, listener: todo.append((event, listener))
         self.add_dispatcher(dispatcher)
-        yield todo
-        self.pop_dispatcher()
+        try:
+            yield todo
+        finally:
+            self.pop_dispatcher()
     
     @contextmanager
-    def unique(self):
+    def unique(self, maxsize=None):
         '''
         remove duplicate events.
+        
+        .. seealso:: :func:`unique`
         '''
-        todo = set()
-        dispatcher = lambda event, listener: todo.add((event, listener))
+        coalescer = Coalescer(maxsize)
         
-        self.add_dispatcher(dispatcher)
-        yield
-        self.pop_dispatcher()
+        self.add_dispatcher(coalescer)
+        try:
+            yield coalescer
+        finally:
+            self.pop_dispatcher()
         
-        for event, listener in todo:
-            event.dispatch(listener)
+        coalescer.flush(_dispatch)
     
     def etrigger(self, target, **metadata):
         '''
         trigger an event.
         
-        :param target: only listeners listening to this target will fire 
+        :param target: only listeners listening to this target will fire. 
+                       Targets are interned for good (see `intern_target`).
         '''
         target = concat_targets(target, None)
-        event = Event(self, target, **metadata)
+        dispatcher = metadata.pop('dispatcher', None)
+        self._emit(target, metadata, dispatcher)
+        
+    def _emit(self, target, payload, dispatcher=None, key=None):
+        '''
+        Trigger an event with `payload` if anyone is interested in target.
+        
+        :param key: key of target if already known.
+        '''
+        if key is None:
+            key = intern_target(target)
+        if not self._interested(key):
+            return
+        event = Event._acquire(self, target, key, dispatcher, payload)
         self.trigger(event)
         
-    def group_dispatch(self, listeners, event):
-        if listeners:
-            
-            callbacks = listeners.get(event.target, [])
+    def group_dispatch(self, listeners, event, patterns=None):
+        '''
+        Dispatch event to the snapshot of listeners for the event's target, 
+        then to the listeners of matching patterns and then to the catch-all 
+        listeners.
+        '''
+        key = event._key
+        if patterns:
+            groups = [listeners.get(key, ())]
+            groups.extend(patterns.match(key, event))
+            groups.append(listeners.get(None, ()))
+        elif listeners:
+            groups = (listeners.get(key, ()), listeners.get(None, ()))
+        else:
+            return
+        
+        for callbacks in groups:
             for listener in callbacks:
-                cb = listener() if isinstance(listener, weakref.ref) else listener
-                if cb is None: 
-                    callbacks.remove(listener)
-                    continue
-                
-                event.dispatch(cb)
-                if event.stop: return 
-                
-            callbacks = listeners.get(None, [])
-            for listener in listeners.get(None, []):
-                cb = listener() if isinstance(listener, weakref.ref) else listener
-                if cb is None: 
-                    callbacks.remove(listener)
-                    continue
                 event.dispatch(listener)
+                if event.stop: return 
+    
+    def static_dispatch(self, event):
+        '''
+        Dispatch event to the static listeners of the instance's class, bound 
+        to the instance.
+        '''
+        static = self._static
+        if not static:
+            return
+        
+        instance = self._instance()
+        if instance is None:
+            return
+        
+        for callbacks in (static.get(event._key, ()), static.get(None, ())):
+            for function in callbacks:
+                event.dispatch(MethodType(function, instance))
                 if event.stop: return
                 
+    def purge(self):
+        '''
+        Remove dead weak references from this object's listeners and from the 
+        global listeners. 
+        
+        Weak listeners added with :meth:`listen` are removed automatically as 
+        soon as they die, so this is rarely needed.
+        '''
+        _purge_table(self._listeners)
+        _purge_table(type(self).global_listeners)
+        if self._patterns is not None:
+            self._patterns.purge()
+        type(self).global_patterns.purge()
+        Snitch.listeners_changed()
+    
+    @staticmethod
+    def listeners_changed():
+        '''
+        Invalidate the cached :meth:`interested` summaries of all objects.
+        '''
+        Snitch._generation_ += 1
+    
+    def interested(self, target):
+        '''
+        Return True if triggering an event with this target could reach any 
+        listener, either on this object, in the global listeners, or on 
+        any upstream node.  
+        
+        The result is cached until a listener or connection changes.
+        '''
+        return self._interested(intern_target(target))
+    
+    def _interest_cache(self):
+        if self._interest_generation != Snitch._generation_:
+            self._interest = {}
+            self._interest_generation = Snitch._generation_
+        return self._interest
+    
+    def _interested(self, key):
+        try:
+            return self._interest_cache()[key]
+        except KeyError:
+            return self._compute_interest(key)
+    
+    def _listens(self, key, target=None):
+        '''
+        True if an event with this key reaches a listener of this object or a 
+        global listener, ignoring upstream nodes. Patterns are matched against 
+        target if key is `_NO_KEY`.
+        '''
+        for listeners in (self._static, self._listeners, type(self).global_listeners):
+            if key in listeners or None in listeners:
+                return True
+        
+        for patterns in (self._patterns, type(self).global_patterns):
+            if not patterns:
+                continue
+            if key != _NO_KEY:
+                if patterns.match(key):
+                    return True
+            elif patterns.root.match(target):
+                return True
+        return False
+    
+    def _compute_interest(self, key):
+        # Depth first search of the upstream graph with an explicit stack. 
+        # When a listener is found, every node on the stack is on the path to 
+        # it. A node is not interested once all of its upstream nodes are done.
+        # Targets that are not interned (key _NO_KEY) are built from the 
+        # stack only to match patterns, and their interest is not cached.
+        if self._listens(key):
+            self._interest_cache()[key] = True
+            return True
+        
+        stack = [(self, key, iter(self._upstream), None)]
+        while stack:
+            node, key, edges, _ = stack[-1]
+            for ref, target, target_key in edges:
+                up = ref()
+                if up is None:
+                    continue
+                up_key = key if target_key is None else _concat_key(target_key, key)
+                if up_key == _NO_KEY:
+                    patterns = up._patterns or type(up).global_patterns
+                    if up._listens(up_key, _stack_target(stack, target) if patterns else None):
+                        _cache_interest(stack)
+                        return True
+                else:
+                    interest = up._interest_cache()
+                    known = interest.get(up_key)
+                    if known is False:
+                        continue
+                    if known or up._listens(up_key):
+                        interest[up_key] = True
+                        _cache_interest(stack)
+                        return True
+                stack.append((up, up_key, iter(up._upstream), target))
+                break
+            else:
+                del stack[-1]
+                if key != _NO_KEY:
+                    node._interest[key] = False
+        return False
+        
+    def notify(self, event):
+        '''
+        Dispatch event to the listeners of this object and to the global 
+        listeners, without propagating it to upstream nodes.
+        '''
+        self.static_dispatch(event)
+        self.group_dispatch(self._listeners, event, self._patterns)
+        self.group_dispatch(type(self).global_listeners, event, 
+                            type(self).global_patterns)
+        
     def trigger(self, event):
         '''
         
         :param event: `Event` object to trigger
         '''
-        
-        self.group_dispatch(self._listeners, event)
-        self.group_dispatch(type(self).global_listeners, event)
+        self.notify(event)
         self.bubble(event)
         
     def __repr__(self):
         return '<%s for %r>' % (type(self).__name__, self._instance())
     
+    def __del__(self):
+        # Paths through this object are about to disappear from the graph.
+        try:
+            if self._upstream or self._downstream:
+                Snitch._graph_generation_ += 1
+        except Exception:
+            pass
 
     def add_upstream(self, node, target):
         '''
         Add a upstream connection
+        
+        :raises EventCycleError: if node is already downstream of this object.
         '''
-        self._upstream.setdefault(node, set()).add(target)
+        if self._link(node, target):
+            Snitch._graph_generation_ += 1
+        Snitch.listeners_changed()
             
     def remove_upstream(self, node, target):
         '''
         Remove a node from upstream connections
         '''
-        targets = self._upstream.get(node, set())
-        targets.discard(target)
+        unlinked = self._unlink(node, target)
+        if unlinked is None:
+            return
+        if unlinked:
+            Snitch._graph_generation_ += 1
+        Snitch.listeners_changed()
+    
+    def _link(self, node, target):
+        # Add the edge without invalidating any caches. Returns None if the 
+        # edge already existed, otherwise True if node was not upstream yet.
+        
+        # Edges to upstream nodes that have died are dropped here
+        edges = [edge for edge in self._upstream if edge[0]() is not None]
+        linked = [edge for edge in edges if edge[0]() is node]
+        if any(edge[1] == target for edge in linked):
+            return None
+        
+        if not linked:
+            _maintain_order(self, node)
+            if node._downstream is _EMPTY_SET:
+                node._downstream = weakref.WeakSet()
+            node._downstream.add(self)
+        
+        edges.append((weakref.ref(node), target, _table_key(target)))
+        self._upstream = tuple(edges)
+        return not linked
+    
+    def _unlink(self, node, target):
+        # Remove the edge without invalidating any caches. Returns None if 
+        # there was no such edge, otherwise True if node is no longer upstream.
+        edges = []
+        found = linked = False
+        for edge in self._upstream:
+            up = edge[0]()
+            if up is None:
+                continue
+            if up is node:
+                if edge[1] == target:
+                    found = True
+                    continue
+                linked = True
+            edges.append(edge)
+        self._upstream = tuple(edges)
+        
+        if not found:
+            return None
+        if not linked:
+            node._downstream.discard(self)
+        return not linked
+    
+    def compact(self):
+        '''
+        Drop the edges to upstream objects that have died and give up the 
+        containers that have become empty, sharing the empty singletons again.
+        '''
+        self._upstream = tuple(edge for edge in self._upstream if edge[0]() is not None)
+        if not self._downstream:
+            self._downstream = _EMPTY_SET
+        if not self._listeners:
+            self._listeners = _EMPTY
+        if self._patterns is not None and not self._patterns:
+            self._patterns = None
+        self._interest = _EMPTY
+        self._interest_generation = -1
     
     def bubble(self, event):
         '''
         Propagate this event up to upstream nodes connected with 'connect'.
+        
+        Upstream nodes are notified depth first, walking the graph with an 
+        explicit stack so the depth of the graph is not limited by the 
+        recursion limit. When a listener of an upstream node stops the event, 
+        the nodes upstream of that node are still notified and propagation 
+        ends there.
+        
+        See `deduplicate` to deliver the event only once to nodes reachable 
+        through several paths.
         '''
-        for node, targets in self._upstream.items():
-            for target in targets: 
-                event_new = event.bubble_target(node, target)
-                node.trigger(event_new)
-                if event_new.stop:
-                    event.stop = True
+        if not self._upstream:
+            return
+        
+        stats = _dedupe_stats.get()
+        if stats is None:
+            seen = None
+        else:
+            stats.propagations += 1
+            seen = set()
+            # Targets that are not interned are identified by the path they 
+            # were built along, numbered below _NO_KEY for this propagation
+            paths = {}
+            
+        stack = [(event, iter(self._upstream), event._key)]
+        while stack:
+            event, edges, identity = stack[-1]
+            for ref, target, target_key in edges:
+                node = ref()
+                if node is None:
+                    continue
+                bubbled = event._bubble(node, target, target_key)
+                if seen is not None:
+                    if target is None:
+                        up_identity = identity
+                    elif bubbled._key != _NO_KEY:
+                        up_identity = bubbled._key
+                    else:
+                        up_identity = paths.setdefault((identity, target_key), 
+                                                       _NO_KEY - 1 - len(paths))
+                    if (node, up_identity) in seen:
+                        stats.avoided += 1
+                        continue
+                    seen.add((node, up_identity))
+                else:
+                    up_identity = None
+                    
+                node.notify(bubbled)
+                stack.append((bubbled, iter(node._upstream), up_identity))
+                break
+            else:
+                del stack[-1]
+                if not stack:
+                    return
+                if event.stop:
+                    for parent, _, _ in stack:
+                        parent.stop = True
                     return
 
     def listen(self, target, listener, weak=None):
         '''
         Add a listener to listen to events with target 'target'.
+        
+        The target may be a pattern containing wildcard segments. `'*'` 
+        matches any one segment and `'**'` matches any number of segments::
+        
+            events(obj).listen(('child', '*', 'changed'), listener)
+            events(obj).listen(('**', 'changed'), listener)
+        
+        :param weak: if True only keep a weak reference to the listener. By 
+                     default bound methods are referenced weakly and other 
+                     listeners strongly. 
         '''
         
-        listeners = self._listeners.setdefault(target , [])
-        if weak:
-            ref = method_ref(listener)
-        elif weak is None and isinstance(listener, MethodType):
-            ref = method_ref(listener)
+        if weak or (weak is None and isinstance(listener, MethodType)):
+            ref = weak_callback(listener, _unlistener(weakref.ref(self), target))
         else:
             ref = listener
         
-        listeners.append(ref)
+        if is_pattern(target):
+            if self._patterns is None:
+                self._patterns = _PatternIndex()
+            self._patterns.add(target, ref)
+        else:
+            if self._listeners is _EMPTY:
+                self._listeners = {}
+            _add_to_table(self._listeners, _table_key(target), ref)
+        Snitch.listeners_changed()
             
     def unlisten(self, target, listener=None):
         '''
         Remove a listener. 
         '''
-        if target in self._listeners:
+        if is_pattern(target):
+            if self._patterns is not None:
+                self._patterns.remove(target, listener)
+                Snitch.listeners_changed()
+            return
+        
+        key = _table_key(target)
+        if key in self._listeners:
             if listener is None:
-                del self._listeners[target]
-            elif listener in self._listeners[target]:
-                self._listeners[target].remove(listener)
+                del self._listeners[key]
+            else:
+                _remove_from_table(self._listeners, key, listener)
+            Snitch.listeners_changed()
     
     def on(self, target, listener):
         self.listen((target,), listener)
+
+def _unlistener(snitch_ref, target):
+    '''
+    Callback removing a dead weak listener from a Snitch as soon as it dies.
+    '''
+    def unlisten(ref):
+        snitch = snitch_ref()
+        if snitch is not None:
+            snitch.unlisten(target, ref)
+    return unlisten
         
     
+def _upstream_nodes(snitch):
+    for ref, _, _ in snitch._upstream:
+        node = ref()
+        if node is not None:
+            yield node
+
+def _maintain_order(ds_snitch, us_snitch):
+    '''
+    Update the topological order for a new connection from ds_snitch to us_snitch.
+    
+    This is the Pearce-Kelly algorithm: if the order already agrees with the 
+    new connection nothing needs to be done. Otherwise only the nodes whose 
+    positions lie between the two objects are searched and reordered.
+    
+    When none of the nodes found upstream of us_snitch have further upstream 
+    connections (eg. a new parent object is connected to an existing tree) 
+    they are simply moved above every other object.
+    
+    :raises EventCycleError: if the connection would create a cycle.
+    '''
+    lower, upper = us_snitch._order, ds_snitch._order
+    if lower > upper:
+        return 
+    
+    # Nodes upstream of us_snitch that must move after ds_snitch
+    forward = []
+    seen = set([us_snitch])
+    todo = [us_snitch]
+    closed = True
+    while todo:
+        node = todo.pop()
+        if node is ds_snitch:
+            raise EventCycleError('Can not connect %r to %r' % (us_snitch, ds_snitch))
+        forward.append(node)
+        for up in _upstream_nodes(node):
+            if up._order > upper:
+                closed = False
+            elif up not in seen:
+                seen.add(up)
+                todo.append(up)
+    
+    key = lambda node: node._order
+    forward.sort(key=key)
+    if closed:
+        for node in forward:
+            node._order = next(Snitch._top_order_counter_)
+        return
+    
+    # Nodes downstream of ds_snitch that must move before us_snitch
+    backward = []
+    seen = set([ds_snitch])
+    todo = [ds_snitch]
+    while todo:
+        node = todo.pop()
+        backward.append(node)
+        for down in node._downstream:
+            if down._order > lower and down not in seen:
+                seen.add(down)
+                todo.append(down)
+    
+    backward.sort(key=key)
+    nodes = backward + forward
+    orders = sorted(node._order for node in nodes)
+    for node, order in zip(nodes, orders):
+        node._order = order
+    
 def _sn_connected(us_snitch, ds_snitch):
     '''
     Test if to snitch objects are connected.
@@ -440,11 +1425,36 @@ def _sn_connected(us_snitch, ds_snitch):
     if us_snitch is ds_snitch:
         return True
     
-    for node in ds_snitch._upstream.keys():
-        if _sn_connected(us_snitch, node):
-            return True
-
-    return False
+    upper = us_snitch._order
+    if ds_snitch._order > upper:
+        return False
+    
+    if Snitch._connected_memo_generation_ != Snitch._graph_generation_:
+        Snitch._connected_memo_ = {}
+        Snitch._connected_memo_generation_ = Snitch._graph_generation_
+    
+    key = (upper, ds_snitch._order)
+    memo = Snitch._connected_memo_
+    if key in memo:
+        return memo[key]
+    
+    result = False
+    seen = set([ds_snitch])
+    todo = [ds_snitch]
+    while todo:
+        node = todo.pop()
+        for up in _upstream_nodes(node):
+            if up is us_snitch:
+                result = True
+                break
+            if up._order < upper and up not in seen:
+                seen.add(up)
+                todo.append(up)
+        if result:
+            break
+        
+    memo[key] = result
+    return result
     
 def connected(upstream, downstream):
     '''
@@ -460,13 +1470,15 @@ def connected(upstream, downstream):
 def connect(upstream, downstream, target, init=True):
     '''
     Connect two objects together so that events will bubble upstream.
-    '''
-    if connected(downstream, upstream):
-        raise EventCycleError('Can not connect %r to %r' % (upstream, downstream))
     
+    :raises EventCycleError: if upstream is already downstream of downstream.
+    '''
     ds_snitch = events(downstream)
     us_snitch = events(upstream)
-    ds_snitch.add_upstream(us_snitch, target)
+    try:
+        ds_snitch.add_upstream(us_snitch, target)
+    except EventCycleError:
+        raise EventCycleError('Can not connect %r to %r' % (upstream, downstream))
 
 def disconnect(upstream, downstream, target, init=True):
     '''
@@ -476,23 +1488,163 @@ def disconnect(upstream, downstream, target, init=True):
     us_snitch = events(upstream, init)
     ds_snitch.remove_upstream(us_snitch, target)
     
+def connect_many(edges, init=True):
+    '''
+    Connect a batch of `(upstream, downstream, target)` edges. 
+    
+    This is equivalent to calling :func:`connect` for each edge, but the 
+    cached results of :func:`connected` and :meth:`Snitch.interested` are 
+    invalidated once for the whole batch. The batch is atomic.
+    
+    :raises EventCycleError: if the edges would create a cycle. None of the 
+                             edges are connected in that case. 
+    '''
+    linked = []
+    try:
+        for upstream, downstream, target in edges:
+            ds_snitch = events(downstream, init)
+            us_snitch = events(upstream, init)
+            try:
+                if ds_snitch._link(us_snitch, target) is not None:
+                    linked.append((ds_snitch, us_snitch, target))
+            except EventCycleError:
+                raise EventCycleError('Can not connect %r to %r' % (upstream, downstream))
+    except BaseException:
+        # Removing edges never invalidates the topological order, so undoing 
+        # the links is enough to restore the graph.
+        for ds_snitch, us_snitch, target in reversed(linked):
+            ds_snitch._unlink(us_snitch, target)
+        raise
+    finally:
+        if linked:
+            Snitch._graph_generation_ += 1
+            Snitch.listeners_changed()
+
+def disconnect_many(edges, init=True):
+    '''
+    Disconnect a batch of `(upstream, downstream, target)` edges and compact 
+    the objects involved (see :meth:`Snitch.compact`). 
+    '''
+    touched = {}
+    for upstream, downstream, target in edges:
+        ds_snitch = events(downstream, init)
+        us_snitch = events(upstream, init)
+        if ds_snitch._unlink(us_snitch, target) is not None:
+            touched[ds_snitch] = touched[us_snitch] = None
+    
+    for snitch in touched:
+        snitch.compact()
+    if touched:
+        Snitch._graph_generation_ += 1
+        Snitch.listeners_changed()
+
+def dispose(instance):
+    '''
+    Tear down the tree of objects downstream of instance.
+    
+    instance is disconnected from its upstream objects. Each downstream 
+    object that is only connected to disposed objects is disposed too, the 
+    others are only disconnected from the disposed objects. Disposed objects 
+    lose their connections and the listeners added with :meth:`Snitch.listen`.
+    
+    Runs in time linear in the number of disposed objects and connections.
+    
+    :returns: the number of disposed objects.
+    '''
+    root = snitch_of(instance)
+    if root is None:
+        return 0
+    
+    disposed = [root]
+    doomed = set(disposed)
+    # Number of upstream nodes that are not disposed (yet)
+    remaining = {}
+    for node in disposed:
+        for down in node._downstream:
+            if down in doomed:
+                continue
+            count = remaining.get(down)
+            if count is None:
+                count = len(set(_upstream_nodes(down)))
+            remaining[down] = count = count - 1
+            if not count:
+                doomed.add(down)
+                disposed.append(down)
+                
+    for down in remaining:
+        if down not in doomed:
+            down._upstream = tuple(edge for edge in down._upstream 
+                                   if edge[0]() not in doomed)
+            
+    for node in disposed:
+        for up in _upstream_nodes(node):
+            if up not in doomed:
+                up._downstream.discard(node)
+        node._upstream = ()
+        node._downstream = _EMPTY_SET
+        node._listeners = _EMPTY
+        node._patterns = None
+        node.compact()
+    
+    Snitch._graph_generation_ += 1
+    Snitch.listeners_changed()
+    return len(disposed)
+
+#: Snitches of objects that can not store a `__snitch__` attribute (e.g. 
+#: classes with `__slots__`), keyed by the object's id.
+_snitch_registry = {}
+
+def _unregister(ref):
+    snitch = _snitch_registry.get(ref.key)
+    if snitch is not None and snitch._instance is ref:
+        del _snitch_registry[ref.key]
+
+def snitch_of(instance):
+    '''
+    Return the Snitch of instance, or None if its events are not initialized.
+    '''
+    snitch = getattr(instance, '__snitch__', None)
+    if isinstance(snitch, Snitch):
+        return snitch
+    # Classes with a __snitch__ slot hold its descriptor
+    if not _snitch_registry:
+        return None
+    snitch = _snitch_registry.get(id(instance))
+    if snitch is not None and snitch._instance() is instance:
+        return snitch
+    return None
+
 def events(instance, init=False):
     '''
     Get the events class associated with this object. 
     If init is true. call init_events if events are uninitialized, otherwize, raise an 
     exception.
     '''
-    if init and not hasattr(instance, '__snitch__'):
+    snitch = snitch_of(instance)
+    if snitch is None:
+        if not init:
+            raise AttributeError('events of %r are not initialized' % (instance,))
         init_events(instance)
-     
-    return instance.__snitch__
+        snitch = snitch_of(instance)
+    return snitch
 
 def init_events(*instances):
     '''
-    Initialize the events for an object
+    Initialize the events for an object. 
+    
+    The Snitch is stored in the object's `__snitch__` attribute. Classes with 
+    `__slots__` may reserve a `'__snitch__'` slot for it. Otherwise, objects 
+    that can not store the attribute are kept in a registry keyed by identity, 
+    which only requires them to support weak references.
     '''
     for instance in instances:
-        instance.__snitch__ = Snitch(instance)
+        snitch = Snitch(instance)
+        try:
+            instance.__snitch__ = snitch
+        except AttributeError:
+            key = id(instance)
+            snitch._instance = weakref.KeyedRef(instance, _unregister, key)
+            _snitch_registry[key] = snitch
     
 
 class listenable(initializable):
@@ -502,6 +1654,7 @@ class listenable(initializable):
     
     def __init__(self):
         self._listeners = {}
+        self._target_keys = {}
         
     def add_listener(self, target, listener):
         self._listeners.setdefault(target, []).append(listener)
@@ -515,25 +1668,38 @@ class listenable(initializable):
     def target(self):
         return self
     
+    def _target_key(self, target=None):
+        '''
+        Cached key (see `intern_target`) of this listenable's target followed by target.
+        '''
+        key = self._target_keys.get(target)
+        if key is None:
+            key = intern_target(concat_targets(self.target, target))
+            self._target_keys[target] = key
+        return key
+    
     def trigger(self, obj, target=None, **metadata):
+        key = self._target_key(target)
         target = concat_targets(self.target, target)
-        snch = events(obj)
-        event = Event(snch, target, **metadata)
-        snch.trigger(event)
+        events(obj)._emit(target, metadata, key=key)
         
+    def __property_slots__(self, key):
+        # Slotted classes with listeners keep their Snitch in a slot
+        return ('__snitch__', '__weakref__')
+    
     def __init_property__(self, cls, key):
-        if '__listeners__' not in cls.__dict__:
+        # The target's hash may change once the property knows its name
+        self._target_keys = {}
+        
+        # `__listeners__` only holds the listeners declared by this class. The 
+        # base classes' listeners are merged in by `finalize_listeners`.
+        listeners = cls.__dict__.get('__listeners__')
+        if listeners is None:
             listeners = {}
-            base_listeners = getattr(cls, '__listeners__', {})
             setattr(cls, '__listeners__', listeners)
             
-            for key, functions in base_listeners.items():
-                base_listeners.setdefault(key, []).extend(functions)
-        else:    
-            listeners = cls.__dict__['__listeners__']
-            
-        for key, functions in self._listeners.items():
-            listeners.setdefault(key, []).extend(functions)
+        for target, functions in self._listeners.items():
+            listeners.setdefault(target, []).extend(functions)
                 
         
             
@@ -0,0 +1,251 @@
+#-------------------------------------------------------------------------------
+#
+#  Copyright (c) 2011, Enthought, Inc.
+#  All rights reserved.
+#
+#  This software is provided without warranty under the terms of the BSD
+#  license included in /LICENSE.txt and may be redistributed only
+#  under the conditions described in the aforementioned license.  The license
+#  is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+#  Thanks for using Enthought open source!
+#
+#  Author: Sean Ross-Ross
+#
+#-------------------------------------------------------------------------------
+'''
+============================
+Dispatchers
+============================
+
+Dispatchers that run listeners somewhere other than the thread that
+triggered the event. Use them like any other dispatcher::
+
+    dispatcher = AsyncDispatcher(max_concurrency=10)
+
+    with global_dispatcher(dispatcher):
+        obj.x = 1
+
+    await dispatcher.drain()
+    
+or::
+
+    with ThreadPoolDispatcher(max_workers=8) as dispatcher:
+        with global_dispatcher(dispatcher):
+            obj.x = 1
+'''
+
+import asyncio
+import inspect
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+class AsyncDispatcher(object):
+    '''
+    Dispatcher that schedules coroutine listeners as tasks on an asyncio
+    event loop. Listeners that do not return an awaitable are called as usual.
+
+    Events must be triggered from the loop's thread.
+
+    :param max_concurrency: maximum number of coroutine listeners running at once.
+    :param max_pending: maximum number of coroutine listeners scheduled on
+                        the loop. When full, the coroutines of further
+                        listeners wait in a backlog and are scheduled as
+                        others finish. Producers may wait for room with
+                        :meth:`ready` to keep the backlog short.
+    :param loop: event loop to schedule on, defaults to the running loop.
+    '''
+    def __init__(self, max_concurrency=None, max_pending=None, loop=None):
+        if max_pending is not None and max_pending < 1:
+            raise ValueError('max_pending must be at least 1')
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._loop = loop
+        self._semaphore = None
+        self._tasks = set()
+        self._backlog = deque()
+        self._waiters = deque()
+        self._errors = []
+
+    def __len__(self):
+        return len(self._tasks) + len(self._backlog)
+
+    @property
+    def full(self):
+        return self.max_pending is not None and len(self) >= self.max_pending
+
+    def __call__(self, event, listener):
+        result = listener(event)
+        if not inspect.isawaitable(result):
+            return
+
+        # Never raise here: the event has already been delivered to listener
+        if self.max_pending is not None and len(self._tasks) >= self.max_pending:
+            self._backlog.append(result)
+        else:
+            self._schedule(result)
+
+    def _schedule(self, awaitable):
+        loop = self._loop or asyncio.get_running_loop()
+        task = loop.create_task(self._run(awaitable))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    async def _run(self, awaitable):
+        if self.max_concurrency is None:
+            return await awaitable
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await awaitable
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._errors.append(task.exception())
+
+        while self._backlog and len(self._tasks) < self.max_pending:
+            self._schedule(self._backlog.popleft())
+
+        while self._waiters and not self.full:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def ready(self):
+        '''
+        Wait until another coroutine listener can be scheduled.
+        '''
+        while self.full:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+
+    async def drain(self):
+        '''
+        Wait for all scheduled listeners to finish, including listeners
+        scheduled while waiting.
+
+        :raises: the first exception raised by a listener since the last drain.
+        '''
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+        errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+class ThreadPoolDispatcher(object):
+    '''
+    Dispatcher that calls listeners on a `concurrent.futures` executor.
+
+    :param executor: executor to submit listener calls to. If not given a
+                     `ThreadPoolExecutor` is created and shut down by
+                     :meth:`shutdown`.
+    :param max_workers: number of workers of the created executor.
+    :param ordered: if True (the default) listeners for events of the same
+                    object are called one at a time in the order the events
+                    were dispatched. If False all calls are submitted
+                    independently and may run in any order.
+    '''
+    def __init__(self, executor=None, max_workers=None, ordered=True):
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.executor = executor
+        self.ordered = ordered
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._outstanding = 0
+        self._queues = {}
+        self._errors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def __call__(self, event, listener):
+        with self._lock:
+            self._outstanding += 1
+            if not self.ordered:
+                submit = True
+            else:
+                queue = self._queues.get(event.snitch)
+                submit = queue is None
+                if submit:
+                    queue = self._queues[event.snitch] = deque()
+                queue.append((event, listener))
+
+        if not submit:
+            return
+        try:
+            if self.ordered:
+                self.executor.submit(self._run_queue, event.snitch)
+            else:
+                self.executor.submit(self._run, event, listener)
+        except Exception:
+            if not self.ordered:
+                self._finished()
+                raise
+            # Nothing will run the queue, drop it with the events queued since
+            with self._lock:
+                dropped = len(self._queues.pop(event.snitch))
+            self._finished(dropped)
+            raise
+
+    def _call(self, event, listener):
+        try:
+            listener(event)
+        except BaseException as exc:
+            with self._lock:
+                self._errors.append(exc)
+
+    def _run(self, event, listener):
+        self._call(event, listener)
+        self._finished()
+
+    def _run_queue(self, snitch):
+        while True:
+            with self._lock:
+                queue = self._queues[snitch]
+                if not queue:
+                    del self._queues[snitch]
+                    return
+                event, listener = queue.popleft()
+            self._call(event, listener)
+            self._finished()
+
+    def _finished(self, count=1):
+        with self._lock:
+            self._outstanding -= count
+            if not self._outstanding:
+                self._idle.notify_all()
+
+    def join(self, timeout=None):
+        '''
+        Wait until every dispatched listener has been called.
+
+        :returns: False if the timeout expired first, True otherwise.
+        :raises: the first exception raised by a listener since the last join.
+        '''
+        with self._lock:
+            if not self._idle.wait_for(lambda: not self._outstanding, timeout):
+                return False
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+        return True
+
+    def shutdown(self):
+        '''
+        Wait for all listeners and shut down the executor if it was created
+        by this dispatcher.
+        '''
+        try:
+            self.join()
+        finally:
+            if self._owns_executor:
+                self.executor.shutdown()
@@ -0,0 +1,176 @@
+#-------------------------------------------------------------------------------
+#
+#  Copyright (c) 2011, Enthought, Inc.
+#  All rights reserved.
+#
+#  This software is provided without warranty under the terms of the BSD
+#  license included in /LICENSE.txt and may be redistributed only
+#  under the conditions described in the aforementioned license.  The license
+#  is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+#  Thanks for using Enthought open source!
+#
+#  Author: Sean Ross-Ross
+#
+#-------------------------------------------------------------------------------
+
+
+import unittest
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from traity.events import init_events, events, global_dispatcher
+from traity.events.dispatchers import AsyncDispatcher, ThreadPoolDispatcher
+
+
+class AnyObject(object):
+    pass
+
+
+class TestAsyncDispatcher(unittest.TestCase):
+
+    def test_coroutine_listeners(self):
+        obj = AnyObject()
+        init_events(obj)
+        
+        running = []
+        seen = []
+        
+        async def slow(event):
+            running.append(event.value)
+            self.assertLessEqual(len(running), 2)
+            await asyncio.sleep(0.01)
+            running.remove(event.value)
+            seen.append(event.value)
+            
+        def fast(event):
+            seen.append('sync')
+            
+        events(obj).listen(('x',), slow)
+        events(obj).listen(('y',), fast)
+        
+        async def main():
+            dispatcher = AsyncDispatcher(max_concurrency=2)
+            with global_dispatcher(dispatcher):
+                for value in range(5):
+                    events(obj).etrigger('x', value=value)
+                events(obj).etrigger('y')
+            self.assertEqual(seen, ['sync'])
+            self.assertEqual(len(dispatcher), 5)
+            await dispatcher.drain()
+            self.assertEqual(len(dispatcher), 0)
+            
+        asyncio.run(main())
+        self.assertEqual(sorted(seen[1:]), list(range(5)))
+        
+    def test_backpressure(self):
+        obj = AnyObject()
+        init_events(obj)
+        
+        seen = []
+        
+        async def listener(event):
+            await asyncio.sleep(0)
+            if event.value == 'bad':
+                raise ValueError(event.value)
+            seen.append(event.value)
+            
+        events(obj).listen(('x',), listener)
+        
+        async def main():
+            dispatcher = AsyncDispatcher(max_pending=2)
+            with global_dispatcher(dispatcher):
+                events(obj).etrigger('x', value=1)
+                events(obj).etrigger('x', value='bad')
+                self.assertTrue(dispatcher.full)
+                # Waits in the backlog instead of failing the trigger
+                events(obj).etrigger('x', value=3)
+                self.assertEqual((len(dispatcher._tasks), len(dispatcher)), (2, 3))
+                
+                await dispatcher.ready()
+                self.assertFalse(dispatcher.full)
+                events(obj).etrigger('x', value=4)
+                
+            with self.assertRaises(ValueError):
+                await dispatcher.drain()
+            await dispatcher.drain()
+            self.assertEqual(len(dispatcher), 0)
+                
+        asyncio.run(main())
+        self.assertEqual(sorted(seen), [1, 3, 4])
+        
+        with self.assertRaises(ValueError):
+            AsyncDispatcher(max_pending=0)
+
+
+class TestThreadPoolDispatcher(unittest.TestCase):
+    
+    def test_ordered(self):
+        objs = [AnyObject() for _ in range(4)]
+        init_events(*objs)
+        seen = dict((id(obj), []) for obj in objs)
+        
+        def listener(event):
+            time.sleep(0.001)
+            seen[id(event.obj)].append(event.value)
+            
+        for obj in objs:
+            events(obj).listen(('x',), listener)
+            
+        with ThreadPoolDispatcher(max_workers=4) as dispatcher:
+            with global_dispatcher(dispatcher):
+                for value in range(20):
+                    for obj in objs:
+                        events(obj).etrigger('x', value=value)
+                        
+        for values in seen.values():
+            self.assertEqual(values, list(range(20)))
+            
+    def test_unordered(self):
+        obj = AnyObject()
+        init_events(obj)
+        barrier = threading.Barrier(3, timeout=5)
+        
+        def listener(event):
+            if event.value == 'fail':
+                raise ValueError(event.value)
+            barrier.wait()
+            
+        events(obj).listen(('x',), listener)
+        
+        with ThreadPoolDispatcher(max_workers=3, ordered=False) as dispatcher:
+            with global_dispatcher(dispatcher):
+                for value in range(3):
+                    events(obj).etrigger('x', value=value)
+            self.assertTrue(dispatcher.join())
+            
+            with global_dispatcher(dispatcher):
+                events(obj).etrigger('x', value='fail')
+            with self.assertRaises(ValueError):
+                dispatcher.join()
+
+    def test_submit_fails(self):
+        obj = AnyObject()
+        init_events(obj)
+        seen = []
+        events(obj).listen(('x',), seen.append)
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.shutdown()
+        dispatcher = ThreadPoolDispatcher(executor)
+        with global_dispatcher(dispatcher):
+            with self.assertRaises(RuntimeError):
+                events(obj).etrigger('x')
+        self.assertTrue(dispatcher.join(timeout=5))
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            dispatcher.executor = executor
+            with global_dispatcher(dispatcher):
+                events(obj).etrigger('x')
+            self.assertTrue(dispatcher.join(timeout=5))
+        self.assertEqual(len(seen), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
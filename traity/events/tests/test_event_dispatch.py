@@ -15,6 +15,8 @@
 #-------------------------------------------------------------------------------
 
 import unittest
+import threading
+import asyncio
 from traity.events import init_events, events, queue, unique, quiet
 
 class AnyObject(object):
@@ -155,6 +157,120 @@ class Test(unittest.TestCase):
             events(obj).etrigger('any_target', dispatcher=lambda event, listener: listener(event))
             self.assertEqual(obj.id1, 2) #event dispatcher has higher priority than 'quiet'
         
+    def test_dispatcher_layers(self):
+        obj = AnyObject()
+        init_events(obj)
+        obj.id1 = 0
+        
+        def seen(event):
+            obj.id1 += 1
+            
+        events(obj).on('any_target', seen)
+        
+        # The object dispatcher was added last
+        with queue() as tocall:
+            with events(obj).quiet():
+                events(obj).etrigger('any_target')
+        self.assertEqual(len(tocall), 0)
+        
+        # The global dispatcher was added last
+        with events(obj).quiet():
+            with queue() as tocall:
+                events(obj).etrigger('any_target')
+        self.assertEqual(len(tocall), 1)
+        
+        # Objects created in a global context are affected by it
+        with queue() as tocall:
+            obj2 = AnyObject()
+            init_events(obj2)
+            events(obj2).on('any_target', seen)
+            events(obj2).etrigger('any_target')
+        self.assertEqual(len(tocall), 1)
+        self.assertEqual(obj.id1, 0)
+        
+        events(obj2).etrigger('any_target')
+        self.assertEqual(obj.id1, 1)
+        
+        for snitch in (events(obj), events(obj2)):
+            with self.assertRaises(IndexError):
+                snitch.pop_dispatcher()
+        
+    def test_context_local_dispatchers(self):
+        obj = AnyObject()
+        init_events(obj)
+        seen = []
+        events(obj).on('any_target', seen.append)
+        
+        def trigger():
+            events(obj).etrigger('any_target')
+            
+        with quiet():
+            thread = threading.Thread(target=trigger)
+            thread.start()
+            thread.join()
+            trigger()
+        self.assertEqual(len(seen), 1)
+        
+        async def quiet_task(started, finish):
+            with quiet():
+                started.set()
+                await finish.wait()
+                trigger()
+            
+        async def main():
+            started, finish = asyncio.Event(), asyncio.Event()
+            task = asyncio.ensure_future(quiet_task(started, finish))
+            await started.wait()
+            trigger()
+            finish.set()
+            await task
+            
+        asyncio.run(main())
+        self.assertEqual(len(seen), 2)
+        
+    def test_unique_coalescing(self):
+        objs = [AnyObject() for _ in range(3)]
+        init_events(*objs)
+        seen = []
+        
+        def listener(event):
+            seen.append((event.obj, event.old, event.new))
+            
+        for obj in objs:
+            events(obj).listen(('x', 'changed'), listener)
+            
+        with unique() as coalescer:
+            for new in range(1, 4):
+                for obj in objs:
+                    events(obj).etrigger(('x', 'changed'), old=new - 1, new=new)
+            self.assertEqual(seen, [])
+            self.assertEqual(len(coalescer), 3)
+            
+        self.assertEqual(coalescer.merged, 6)
+        self.assertEqual(seen, [(obj, 0, 3) for obj in objs])
+        
+        del seen[:]
+        with unique(maxsize=2):
+            for obj in objs:
+                events(obj).etrigger(('x', 'changed'), old=0, new=1)
+            self.assertEqual(len(seen), 3)
+        self.assertEqual(len(seen), 3)
+        
+    def test_object_context_exceptions(self):
+        obj = AnyObject()
+        init_events(obj)
+        seen = []
+        events(obj).on('x', seen.append)
+        
+        for context in (events(obj).quiet, events(obj).queue, events(obj).unique):
+            with self.assertRaises(KeyError):
+                with context():
+                    raise KeyError()
+            self.assertEqual(events(obj)._dispatch_stack, [])
+            
+        events(obj).etrigger('x')
+        self.assertEqual(len(seen), 1)
+        
         
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.test_simple']
@@ -14,7 +14,7 @@
 #
 #-------------------------------------------------------------------------------
 import unittest
-from traity.events import concat_targets
+from traity.events import concat_targets, intern_target, _concat_key
 
 
 class Test(unittest.TestCase):
@@ -33,6 +33,15 @@ class Test(unittest.TestCase):
 
         self.assertEqual(concat_targets(None, None), None)
 
+    def test_intern_target(self):
+        key = intern_target(('a', 'b'))
+        self.assertIsInstance(key, int)
+        self.assertEqual(intern_target(('a', 'b')), key)
+        self.assertNotEqual(intern_target(('b', 'a')), key)
+        self.assertEqual(intern_target(None), 0)
+        
+        self.assertEqual(_concat_key(intern_target('a'), intern_target(('b',))), key)
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.test_concat_targets']
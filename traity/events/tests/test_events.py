@@ -16,9 +16,13 @@
 
 import unittest
 from traity.events import init_events, events, connect, disconnect, \
-    global_listener, connected, EventCycleError
+    global_listener, connected, EventCycleError, intern_target, \
+    snitch_of, _snitch_registry, deduplicate, connect_many, disconnect_many, \
+    dispose
 import sys
 import gc
+import warnings
+import traity.events
 
 class AnyObject(object):
     pass
@@ -237,6 +241,355 @@ class Test(unittest.TestCase):
         
         self.assertEqual(obj.x_called, 1)
         
+    def test_unlisten_during_dispatch(self):
+        obj = AnyObject()
+        init_events(obj)
+        seen = []
+        
+        def first(event):
+            seen.append('first')
+            events(obj).unlisten(('a',), first)
+            
+        def second(event):
+            seen.append('second')
+            
+        events(obj).listen(('a',), first)
+        events(obj).listen(('a',), second)
+        
+        snapshot = events(obj)._listeners[intern_target(('a',))]
+        events(obj).etrigger('a')
+        self.assertEqual(seen, ['first', 'second'])
+        self.assertIsInstance(snapshot, tuple)
+        self.assertEqual(events(obj)._listeners[intern_target(('a',))], (second,))
+        
+    def test_purge_dead_refs(self):
+        obj = AnyObject()
+        init_events(obj)
+        
+        def x(event):
+            pass
+        
+        events(obj).listen(('a',), x, weak=True)
+        self.assertIn(intern_target(('a',)), events(obj)._listeners)
+        del x
+        self.assertNotIn(intern_target(('a',)), events(obj)._listeners)
+        
+    def test_interested(self):
+        obj1 = AnyObject()
+        obj2 = AnyObject()
+        init_events(obj1, obj2)
+        
+        def x(event):
+            pass
+        
+        self.assertFalse(events(obj2).interested(('c', 'x')))
+        connect(obj1, obj2, 'c')
+        self.assertFalse(events(obj2).interested(('x',)))
+        
+        events(obj1).listen(('c', 'x'), x)
+        self.assertTrue(events(obj2).interested(('x',)))
+        self.assertFalse(events(obj2).interested(('y',)))
+        
+        disconnect(obj1, obj2, 'c')
+        self.assertFalse(events(obj2).interested(('x',)))
+        
+        with global_listener(x):
+            self.assertTrue(events(obj2).interested(('y',)))
+        self.assertFalse(events(obj2).interested(('y',)))
+        
+    def test_bubbled_event_payload(self):
+        obj1 = AnyObject()
+        obj2 = AnyObject()
+        init_events(obj1, obj2)
+        connect(obj1, obj2, 'c')
+        
+        seen = []
+        events(obj1).listen(('c', 'x'), seen.append)
+        events(obj2).listen(('x',), seen.append)
+        events(obj2).etrigger('x', value=1)
+        
+        inner, outer = seen
+        self.assertEqual(inner.target, ('x',))
+        self.assertEqual(outer.target, ('c', 'x'))
+        self.assertEqual(outer.value, 1)
+        self.assertIs(inner._payload, outer._payload)
+        with self.assertRaises(AttributeError):
+            outer.missing
+            
+    def test_interned_targets_warning(self):
+        limit = traity.events.interned_targets_warning
+        traity.events.interned_targets_warning = len(traity.events._targets)
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                intern_target(('warning', object()))
+                intern_target(('warning', object()))
+        finally:
+            traity.events.interned_targets_warning = limit
+        self.assertEqual([warning.category for warning in caught], [ResourceWarning])
+        
+    def test_deep_connect(self):
+        objs = [AnyObject() for _ in range(5000)]
+        init_events(*objs)
+        
+        for upstream, downstream in zip(objs, objs[1:]):
+            connect(upstream, downstream, 'c')
+        
+        self.assertTrue(connected(objs[0], objs[-1]))
+        self.assertFalse(connected(objs[-1], objs[0]))
+        with self.assertRaises(EventCycleError):
+            connect(objs[-1], objs[0], 'c')
+            
+        # Connecting new parents on top of an existing tree
+        parents = [AnyObject() for _ in range(5000)]
+        init_events(*parents)
+        downstream = objs[0]
+        for upstream in parents:
+            connect(upstream, downstream, 'c')
+            downstream = upstream
+            
+        self.assertTrue(connected(parents[-1], objs[-1]))
+        with self.assertRaises(EventCycleError):
+            connect(objs[-1], parents[-1], 'c')
+        
+    def test_none_target(self):
+        a, b = AnyObject(), AnyObject()
+        init_events(a, b)
+        connect(a, b, None)
+        
+        seen = []
+        events(a).listen(('x',), seen.append)
+        self.assertTrue(events(b).interested(('x',)))
+        events(b).etrigger('x')
+        self.assertEqual([event.target for event in seen], [('x',)])
+        
+    def test_deep_bubble(self):
+        objs = [AnyObject() for _ in range(5000)]
+        init_events(*objs)
+        for upstream, downstream in zip(objs, objs[1:]):
+            connect(upstream, downstream, 'c')
+        
+        seen = []
+        targets = []
+        events(objs[0]).listen(('c',) * 4999 + ('x',), seen.append)
+        events(objs[0]).listen(('**', 'y'), lambda event: targets.append(event.target))
+        self.assertTrue(events(objs[-1]).interested(('x',)))
+        self.assertFalse(events(objs[-1]).interested(('z',)))
+        
+        events(objs[-1]).etrigger('x')
+        events(objs[-1]).etrigger('y')
+        events(objs[-1]).etrigger('z')
+        self.assertEqual(len(seen), 1)
+        self.assertIs(seen[0].snitch, events(objs[0]))
+        self.assertEqual(seen[0].target, ('c',) * 4999 + ('x',))
+        self.assertEqual(targets, [('c',) * 4999 + ('y',)])
+        
+    def test_deep_bubble_interns_nothing(self):
+        objs = [AnyObject() for _ in range(5000)]
+        init_events(*objs)
+        for upstream, downstream in zip(objs, objs[1:]):
+            connect(upstream, downstream, 'c')
+        intern_target('x')
+        intern_target(('x',))
+        intern_target(('y',))
+        
+        size = len(traity.events._targets)
+        self.assertFalse(events(objs[-1]).interested(('x',)))
+        events(objs[-1]).etrigger('x')
+        self.assertEqual(len(traity.events._targets), size)
+        
+        seen = []
+        events(objs[0]).listen(('**', 'x'), seen.append)
+        size = len(traity.events._targets)
+        self.assertTrue(events(objs[-1]).interested(('x',)))
+        self.assertFalse(events(objs[-1]).interested(('y',)))
+        events(objs[-1]).etrigger('x')
+        self.assertEqual(len(traity.events._targets), size)
+        self.assertEqual(len(seen), 1)
+        
+    def test_bubble_stop(self):
+        child, parent1, parent2, grandparent = [AnyObject() for _ in range(4)]
+        init_events(child, parent1, parent2, grandparent)
+        connect(parent1, child, 'c')
+        connect(parent2, child, 'c')
+        connect(grandparent, parent1, 'p')
+        
+        seen = []
+        def stop(event):
+            seen.append(event.snitch)
+            event.stop = True
+        def record(event):
+            seen.append(event.snitch)
+        
+        events(child).listen(('x',), stop)
+        events(parent1).listen(('c', 'x'), stop)
+        events(parent2).listen(('c', 'x'), record)
+        events(grandparent).listen(('p', 'c', 'x'), record)
+        
+        # Stopping at the origin does not prevent bubbling, stopping at an 
+        # upstream node ends propagation after that node's own upstream nodes.
+        events(child).etrigger('x')
+        self.assertEqual([s._instance() for s in seen], [child, parent1, grandparent])
+        
+    def test_deduplicate(self):
+        layers = [AnyObject() for _ in range(11)]
+        middles = [AnyObject() for _ in range(20)]
+        init_events(*layers + middles)
+        for i, (downstream, upstream) in enumerate(zip(layers, layers[1:])):
+            for middle in middles[2 * i:2 * i + 2]:
+                connect(middle, downstream, 'd')
+                connect(upstream, middle, 'm')
+        
+        seen = []
+        events(layers[-1]).listen(('**', 'x'), seen.append)
+        
+        events(layers[0]).etrigger('x')
+        self.assertEqual(len(seen), 2 ** 10)
+        
+        del seen[:]
+        with deduplicate() as stats:
+            events(layers[0]).etrigger('x')
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(stats.propagations, 1)
+        self.assertEqual(stats.avoided, 10)
+        
+    def test_connect_many(self):
+        root = AnyObject()
+        children = [AnyObject() for _ in range(1000)]
+        init_events(root, *children)
+        
+        connect_many([(root, child, 'c') for child in children])
+        self.assertTrue(all(connected(root, child) for child in children))
+        
+        # A cycle anywhere in the batch connects nothing
+        other = AnyObject()
+        init_events(other)
+        with self.assertRaises(EventCycleError):
+            connect_many([(children[0], other, 'o'), (children[1], root, 'r')])
+        self.assertFalse(connected(children[0], other))
+        self.assertFalse(connected(children[1], root))
+        
+        disconnect_many([(root, child, 'c') for child in children[:500]])
+        self.assertFalse(connected(root, children[0]))
+        self.assertTrue(connected(root, children[500]))
+        self.assertIs(events(children[0])._upstream, ())
+        
+    def test_dispose(self):
+        root, child, grandchild, shared, outside = [AnyObject() for _ in range(5)]
+        init_events(root, child, grandchild, shared, outside)
+        connect_many([(root, child, 'c'), (child, grandchild, 'g'), 
+                      (child, shared, 's'), (outside, shared, 's'), 
+                      (outside, root, 'r')])
+        
+        seen = []
+        events(shared).listen(('x',), seen.append)
+        events(grandchild).listen(('x',), seen.append)
+        
+        self.assertEqual(dispose(root), 3)
+        self.assertFalse(connected(outside, root))
+        self.assertFalse(connected(child, shared))
+        self.assertTrue(connected(outside, shared))
+        
+        events(grandchild).etrigger('x')
+        events(shared).etrigger('x')
+        self.assertEqual(len(seen), 1)
+        
+    def test_connected_after_collect(self):
+        obj1 = AnyObject()
+        obj2 = AnyObject()
+        obj3 = AnyObject()
+        init_events(obj1, obj2, obj3)
+        
+        connect(obj1, obj2, 'c')
+        connect(obj2, obj3, 'c')
+        self.assertTrue(connected(obj1, obj3))
+        
+        del obj2
+        gc.collect()
+        self.assertFalse(connected(obj1, obj3))
+        connect(obj3, obj1, 'c')
+        
+    def test_compact_snitch(self):
+        obj1, obj2 = AnyObject(), AnyObject()
+        init_events(obj1, obj2)
+        
+        self.assertFalse(hasattr(events(obj1), '__dict__'))
+        self.assertIs(events(obj1)._listeners, events(obj2)._listeners)
+        self.assertIs(events(obj1)._upstream, events(obj2)._upstream)
+        
+        seen = []
+        events(obj2).listen(('a',), seen.append)
+        connect(obj1, obj2, 'b')
+        self.assertIsNot(events(obj1)._listeners, events(obj2)._listeners)
+        self.assertEqual(len(events(obj1)._listeners), 0)
+        
+        events(obj1).etrigger('x')
+        events(obj2).etrigger('a')
+        self.assertEqual(len(seen), 1)
+        self.assertTrue(connected(obj1, obj2))
+        
+    def test_slotted_objects(self):
+        
+        class Slotted(object):
+            __slots__ = ('__weakref__',)
+            
+        class Reserved(object):
+            __slots__ = ('__snitch__', '__weakref__')
+            
+        parent, child, reserved = AnyObject(), Slotted(), Reserved()
+        self.assertIsNone(snitch_of(child))
+        with self.assertRaises(AttributeError):
+            events(child)
+        
+        init_events(parent, child, reserved)
+        self.assertIs(events(reserved), reserved.__snitch__)
+        self.assertIs(snitch_of(child), events(child))
+        
+        seen = []
+        events(parent).listen(('c', 'a'), seen.append)
+        connect(parent, child, 'c')
+        connect(child, reserved, 'r')
+        events(reserved).etrigger('x')
+        events(child).etrigger('a')
+        self.assertEqual(len(seen), 1)
+        
+        key = id(child)
+        self.assertIn(key, _snitch_registry)
+        del child
+        self.assertNotIn(key, _snitch_registry)
+        
+    def test_pattern_listeners(self):
+        parent = AnyObject()
+        child1 = AnyObject()
+        child2 = AnyObject()
+        init_events(parent, child1, child2)
+        connect(parent, child1, 'c1')
+        connect(parent, child2, 'c2')
+        
+        one, deep, seen_global = [], [], []
+        events(parent).listen(('*', 'x'), lambda event: one.append(event.target))
+        events(parent).listen(('**', 'x'), lambda event: deep.append(event.target))
+        
+        events(child1).etrigger('x')
+        events(child2).etrigger('x')
+        events(child2).etrigger('y')
+        events(parent).etrigger('x')
+        
+        self.assertEqual(one, [('c1', 'x'), ('c2', 'x')])
+        self.assertEqual(deep, [('c1', 'x'), ('c2', 'x'), ('x',)])
+        self.assertTrue(events(child1).interested(('x',)))
+        self.assertFalse(events(child1).interested(('y',)))
+        
+        events(parent).unlisten(('*', 'x'))
+        events(child1).etrigger('x')
+        self.assertEqual(len(one), 2)
+        self.assertEqual(len(deep), 4)
+        
+        with global_listener(seen_global.append, ('**', 'y')):
+            events(child2).etrigger('y')
+        events(child2).etrigger('y')
+        self.assertEqual([event.target for event in seen_global], [('y',), ('c2', 'y')])
+        
         
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.test_simple']
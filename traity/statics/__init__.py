@@ -96,7 +96,10 @@ Delegation may be one of two forms, strict: and can *only* be done when the inst
         # Also can do
         y = delegate(foo, Foo.x)
 '''
-from traity.tools.initializable_property import persistent_property
+from types import MemberDescriptorType
+from traity.tools.initializable_property import persistent_property, class_finalizers
+from traity.statics.validators import instance_of, array_validator, numpy
+from traity.tools.specialize import specialize, unspecialized_class
 class NoDefault: pass
 
 class delegate(object):
@@ -248,7 +251,11 @@ class vproperty(persistent_property):
             self._type = lambda instance, value: type(value)
         else:
             self._type = ftype
+        #: The `type` argument, called directly by compiled accessors
+        self._plain_type = type or None
             
+        if isinstance(instance, instance_of):
+            instance = instance.types[0] if len(instance.types) == 1 else instance.types
         self._instance_of = instance
         self._default = fdefault
         
@@ -257,14 +264,17 @@ class vproperty(persistent_property):
         
         '''
         self._getter = value
+        self._recompile()
         return self
     
     def setter(self, value):
         self._setter = value
+        self._recompile()
         return self
 
     def default(self, method):
         self._default = method
+        self._recompile()
         return self
     
     def type(self, method):
@@ -278,6 +288,8 @@ class vproperty(persistent_property):
         .
         '''
         self._type = method
+        self._plain_type = None
+        self._recompile()
         return method
     
     def _default_getter(self, instance):
@@ -290,11 +302,47 @@ class vproperty(persistent_property):
         else:
             raise AttributeError('Static property has not been set and has no default value')
         
+    def _slot_getter(self, instance):
+        try:
+            return self._slot_get(instance)
+        except AttributeError:
+            if self._default is None:
+                raise AttributeError('Static property has not been set and has no default value')
+        value = self._default(instance)
+        self._slot_set(instance, value)
+        return value
+    
+    def _peek(self, instance):
+        '''
+        Return the current value or `NoDefault` without creating a default value.
+        '''
+        if self._getter == self._default_getter or self._getter == self._slot_getter:
+            return getattr(instance, self.store_key, NoDefault)
+        try:
+            return self._getter(instance)
+        except AttributeError:
+            return NoDefault
+        
     def _default_setter(self, instance, value):
         setattr(instance, self.store_key, value)
         
     def _default_deleter(self, instance):
         delattr(instance, self.store_key)
+    
+    def __init_property__(self, cls, key):
+        persistent_property.__init_property__(self, cls, key)
+        
+        # Read and write slots through their member descriptor directly
+        slot = getattr(cls, self.store_key, None)
+        if isinstance(slot, MemberDescriptorType):
+            self._slot_get = slot.__get__
+            self._slot_set = slot.__set__
+            if self._getter == self._default_getter:
+                self._getter = self._slot_getter
+            if self._setter == self._default_setter:
+                self._setter = self._slot_set
+            if self._deleter == self._default_deleter:
+                self._deleter = slot.__delete__
         
     def __get__(self, instance, owner):
         if instance is None:
@@ -303,14 +351,43 @@ class vproperty(persistent_property):
         return self._getter(instance)
         
     def __set__(self, instance, value):
-            
+        self._setter(instance, self._validate(instance, value))
+        
+    def _validate(self, instance, value):
+        '''
+        Check value and return it converted by the `type` of this property, 
+        without storing it.
+        '''
         if self._instance_of is not None:
             if not isinstance(value, self._instance_of):
                 raise ValueError('Can not assign value of type %r (expected instance of %r)' % (type(value), self._instance_of))
         if self._type is not None:
             value = self._type(instance, value)
+        return value
         
-        self._setter(instance, value)
+    def _array_validator(self):
+        '''
+        Return a validator of arrays of values for this property, or None if 
+        it accepts any value (see `traity.statics.validators.array_validator`).
+        
+        A `type` method is called with None as the instance.
+        '''
+        type = self._plain_type
+        if type is None and self._type is not None:
+            type = lambda value: self._type(None, value)
+        return array_validator(type, self._instance_of)
+    
+    def _validate_array(self, values):
+        '''
+        Check values like `_validate` does for one value and return them 
+        converted, as an array.
+        '''
+        validator = self._array_validator()
+        if validator is not None:
+            return validator.validate_array(values)
+        if numpy is None:
+            return list(values)
+        return numpy.asarray(values)
         
     def __delete__(self, instance):
         self._deleter(instance)
@@ -319,6 +396,104 @@ class vproperty(persistent_property):
     def __getattr__(self, attr):
         return self.delegates_to(attr)
     
+    #===========================================================================
+    # Compiled accessors 
+    #===========================================================================
+    def _compile(self):
+        '''
+        Replace `__get__` and `__set__` with versions compiled for the current 
+        configuration of this property (see `compile_properties`).
+        '''
+        namespace = {}
+        source = self._get_source(namespace) + self._set_source(namespace)
+        specialize(self, '\n'.join(source), namespace)
+        
+    def _recompile(self):
+        if type(self) is not unspecialized_class(self):
+            self._compile()
+            
+    def _storage(self):
+        if self._getter == self._slot_getter:
+            return 'slot'
+        if self._getter == self._default_getter:
+            return 'dict'
+        return None
+        
+    def _get_source(self, namespace):
+        namespace['getter'] = self._getter
+        namespace['store_key'] = self.store_key
+        lines = ['def __get__(self, instance, owner):',
+                 '    if instance is None:',
+                 '        return self']
+        storage = self._storage()
+        if storage == 'slot':
+            namespace['slot_get'] = self._slot_get
+            lines += ['    try:',
+                      '        return slot_get(instance)',
+                      '    except AttributeError:',
+                      '        return getter(instance)']
+        elif storage == 'dict':
+            # AttributeError: instances of subclasses with __slots__ may have 
+            # no __dict__
+            lines += ['    try:',
+                      '        return instance.__dict__[store_key]',
+                      '    except (KeyError, AttributeError):',
+                      '        return getter(instance)']
+        else:
+            lines += ['    return getter(instance)']
+        return lines
+    
+    def _peek_source(self, namespace, target='old'):
+        '''
+        Source of a statement assigning the value of the property or 
+        `NoDefault` to target. 
+        '''
+        namespace['NoDefault'] = NoDefault
+        namespace['store_key'] = self.store_key
+        namespace['peek'] = self._peek
+        if self._storage() is None:
+            return ['%s = peek(instance)' % target]
+        return ['%s = getattr(instance, store_key, NoDefault)' % target]
+    
+    def _store_source(self, namespace):
+        '''
+        Source of the statements validating `value` and storing it. 
+        '''
+        lines = []
+        if self._instance_of is not None:
+            namespace['instance_of'] = self._instance_of
+            lines += ['if not isinstance(value, instance_of):',
+                      "    raise ValueError('Can not assign value of type %r (expected instance of %r)' % (type(value), instance_of))"]
+            
+        if self._plain_type is not None:
+            namespace['convert'] = self._plain_type
+            lines += ['new = convert(value)']
+        elif self._type is not None:
+            namespace['convert'] = self._type
+            lines += ['new = convert(instance, value)']
+        else:
+            lines += ['new = value']
+        
+        if self._storage() == 'slot' and self._setter == self._slot_set:
+            namespace['slot_set'] = self._slot_set
+            lines += ['slot_set(instance, new)']
+        elif self._storage() == 'dict' and self._setter == self._default_setter:
+            namespace['store_key'] = self.store_key
+            namespace['setter'] = self._setter
+            lines += ['try:',
+                      '    instance.__dict__[store_key] = new',
+                      'except AttributeError:',
+                      '    setter(instance, new)']
+        else:
+            namespace['setter'] = self._setter
+            lines += ['setter(instance, new)']
+        return lines
+        
+    def _set_source(self, namespace):
+        lines = ['def __set__(self, instance, value):']
+        lines += ['    ' + line for line in self._store_source(namespace)]
+        return lines
+    
     def delegates_to(self, attr):
         '''
         Delegates to an inner attribute. instance= argument must be set in constructor.
@@ -333,4 +508,21 @@ class vproperty(persistent_property):
         delegate = type(self)._delegate_class_
         return delegate(self, getattr(self._instance_of, attr))
 
+def compile_properties(cls):
+    '''
+    Compile the accessors of the static properties defined in cls. 
+    
+    Each property gets `__get__` and `__set__` methods generated for its 
+    configuration (storage, validation, default), without the checks and 
+    lookups the generic methods do on every access. The methods are 
+    recompiled when the property's getter, setter, default or type is changed.
+    
+    Each compiled property becomes the only instance of its own subclass 
+    (see `traity.tools.specialize`), so use `isinstance` rather than 
+    `type(prop) is vproperty` to test for properties.
+    '''
+    for value in list(cls.__dict__.values()):
+        if isinstance(value, vproperty):
+            value._compile()
 
+class_finalizers.append(compile_properties)
@@ -16,6 +16,7 @@
 import unittest
 from traity.statics import vproperty
 from traity.tools.initializable_property import init_properties
+from traity.tools.specialize import unspecialized_class
 import pickle
 
 @init_properties
@@ -25,6 +26,11 @@ class Picklable(object):
 class NotPicklable(object):
     p = vproperty()
 
+@init_properties(slots=True)
+class Slotted(object):
+    p = vproperty(type=int)
+    q = vproperty(fdefault=lambda self: [])
+
 class Test(unittest.TestCase):
 
     def test_pickle(self):
@@ -37,6 +43,73 @@ class Test(unittest.TestCase):
         
         self.assertEqual(should_be_equal.p, should_store.p)
         
+    def test_slots(self):
+        obj = Slotted()
+        self.assertFalse(hasattr(obj, '__dict__'))
+        self.assertEqual(Slotted.__slots__, ('_p_', '_q_'))
+        
+        with self.assertRaises(AttributeError):
+            obj.p
+        obj.p = '1'
+        self.assertEqual(obj.p, 1)
+        self.assertIs(obj.q, obj.q)
+        
+        copy = pickle.loads(pickle.dumps(obj))
+        self.assertEqual(copy.p, 1)
+        
+        del obj.p
+        with self.assertRaises(AttributeError):
+            obj.p
+        
+    def test_compiled(self):
+        
+        @init_properties
+        class A(object):
+            p = vproperty(type=int, instance=(int, str))
+            q = vproperty(fdefault=lambda self: [])
+            
+            @vproperty
+            def r(self):
+                return self.p * 2
+            
+        self.assertIsNot(type(A.p), vproperty)
+        self.assertIsInstance(A.p, vproperty)
+        self.assertIs(unspecialized_class(A.p), vproperty)
+        
+        a = A()
+        with self.assertRaises(AttributeError):
+            a.p
+        with self.assertRaises(ValueError):
+            a.p = 1.0
+        a.p = '2'
+        self.assertEqual(a.p, 2)
+        self.assertEqual(a.r, 4)
+        self.assertIs(a.q, a.q)
+        
+        @A.p.type
+        def check_p(self, value):
+            return int(value) + 1
+        
+        a.p = '2'
+        self.assertEqual(a.p, 3)
+        
+    def test_compiled_slotted_subclass(self):
+        
+        @init_properties
+        class A(object):
+            __slots__ = ()
+            p = vproperty(fdefault=lambda self: 1)
+            
+        class B(A):
+            __slots__ = ('_p_',)
+            
+        b = B()
+        self.assertFalse(hasattr(b, '__dict__'))
+        self.assertEqual(b.p, 1)
+        b.p = 2
+        self.assertEqual(b.p, 2)
+        self.assertEqual(b._p_, 2)
+        
     def test_instanceof(self):
         class Obj(object):
             p = vproperty(instance=int)
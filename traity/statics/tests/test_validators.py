@@ -0,0 +1,115 @@
+#-------------------------------------------------------------------------------
+#
+#  Copyright (c) 2011, Enthought, Inc.
+#  All rights reserved.
+#
+#  This software is provided without warranty under the terms of the BSD
+#  license included in /LICENSE.txt and may be redistributed only
+#  under the conditions described in the aforementioned license.  The license
+#  is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+#  Thanks for using Enthought open source!
+#
+#  Author: Sean Ross-Ross
+#
+#-------------------------------------------------------------------------------
+import unittest
+from traity.statics import vproperty
+from traity.statics.validators import numpy, coerce, in_range, instance_of, \
+    array_validator
+from traity.tools.initializable_property import init_properties
+
+
+class Test(unittest.TestCase):
+
+    def test_instance_of(self):
+
+        @init_properties
+        class A(object):
+            x = vproperty(instance=instance_of(int))
+            y = vproperty(instance=instance_of(int, str))
+
+        a = A()
+        a.x = 1
+        a.y = 'y'
+        with self.assertRaises(ValueError):
+            a.x = 1.0
+        with self.assertRaises(ValueError):
+            a.y = 1.0
+        self.assertIs(A.x._instance_of, int)
+
+    def test_in_range(self):
+
+        @init_properties
+        class A(object):
+            x = vproperty(type=in_range(0, 10))
+
+        a = A()
+        a.x = 10
+        with self.assertRaises(ValueError):
+            a.x = 11
+        self.assertEqual(a.x, 10)
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_coerce(self):
+        validator = coerce('int32')
+        self.assertEqual(validator(3), 3)
+        self.assertEqual(validator('3'), 3)
+        with self.assertRaises(ValueError):
+            validator(3.5)
+        self.assertEqual(coerce('int32', casting='unsafe')(3.5), 3)
+
+        values = validator.validate_array([1, 2, 3])
+        self.assertEqual(values.dtype, numpy.int32)
+        with self.assertRaises(ValueError):
+            validator.validate_array(numpy.ones(3))
+        with self.assertRaises(ValueError):
+            validator.validate_array(['1', 'x'])
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_arrays(self):
+        validator = in_range(0, 255, dtype='uint8')
+        self.assertEqual(validator.validate_array(numpy.arange(256)).dtype, numpy.uint8)
+        with self.assertRaises(ValueError):
+            validator.validate_array(numpy.arange(-1, 3))
+
+        validator = instance_of(int)
+        validator.validate_array(numpy.arange(3, dtype='int16'))
+        validator.validate_array(numpy.array([1, 2], dtype=object))
+        with self.assertRaises(ValueError):
+            validator.validate_array(numpy.ones(3))
+        with self.assertRaises(ValueError):
+            validator.validate_array(numpy.array([1, 2.0], dtype=object))
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_array_validator(self):
+        self.assertIsNone(array_validator())
+
+        validator = array_validator(int)
+        self.assertEqual(list(validator.validate_array([1.5, 2])), [1, 2])
+        for values in ([numpy.nan], [numpy.inf], [1e30], [2.0 ** 63], [10 ** 30], [2 ** 63]):
+            with self.assertRaises(ValueError):
+                validator.validate_array(values)
+        with self.assertRaises(ValueError):
+            validator(10 ** 30)
+
+        validator = array_validator(float, instance=(int, float))
+        self.assertEqual(validator.validate_array([1, 2]).dtype, numpy.float64)
+        with self.assertRaises(ValueError):
+            validator.validate_array(['1'])
+
+        @init_properties
+        class A(object):
+            x = vproperty(type=str)
+            y = vproperty()
+
+            @y.type
+            def y_type(self, value):
+                return value * 2
+
+        self.assertEqual(list(A.x._validate_array([1, 2])), ['1', '2'])
+        self.assertEqual(list(A.y._validate_array([1, 2])), [2, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
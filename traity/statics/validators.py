@@ -0,0 +1,282 @@
+#-------------------------------------------------------------------------------
+#
+#  Copyright (c) 2011, Enthought, Inc.
+#  All rights reserved.
+#
+#  This software is provided without warranty under the terms of the BSD
+#  license included in /LICENSE.txt and may be redistributed only
+#  under the conditions described in the aforementioned license.  The license
+#  is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+#  Thanks for using Enthought open source!
+#
+#  Author: Sean Ross-Ross
+#
+#-------------------------------------------------------------------------------
+'''
+========================================
+Validators
+========================================
+
+Validators check and convert single values like the `type` and `instance`
+arguments of `vproperty`, and also whole arrays at once with NumPy::
+
+    class Sample(object):
+        level = vproperty(type=in_range(0, 255, dtype='uint8'))
+        count = vproperty(type=coerce('int64'), instance=instance_of(int))
+
+    sample.level = 12                                 # one value
+    in_range(0, 255, dtype='uint8').validate_array(numpy.arange(100))
+
+Bulk assignments, eg. `traity.columnar.Population.set_column`, validate the
+array as a whole instead of calling the property's type once per element.
+Properties with a plain `type` such as int or float are validated as
+arrays too (see `array_validator`).
+
+Validating arrays requires NumPy. Without it they are validated one
+element at a time.
+'''
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: Array types of the simple `type` arguments of properties
+DTYPES = {int: 'int64', float: 'float64', bool: 'bool', complex: 'complex128'}
+
+#: Array kinds (see `numpy.dtype.kind`) holding instances of python types
+KINDS = {bool: 'b', int: 'biu', float: 'f', complex: 'c', str: 'U', bytes: 'S'}
+
+
+class Validator(object):
+    '''
+    Base class of validators.
+
+    Calling a validator checks one value and returns it converted.
+    :meth:`validate_array` checks a sequence and returns it as an array.
+    Both raise ValueError for invalid values.
+    '''
+    #: The dtype of the arrays returned by :meth:`validate_array` or None
+    dtype = None
+
+    def __call__(self, value):
+        return value
+
+    def validate_array(self, values):
+        '''
+        Validate all values and return them as an array (a list if NumPy is
+        not installed).
+
+        The default validates the values one by one.
+        '''
+        values = [self(value) for value in values]
+        if numpy is None:
+            return values
+        return numpy.array(values, dtype=self.dtype)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % item for item in sorted(vars(self).items())))
+
+
+class coerce(Validator):
+    '''
+    Convert values to a NumPy dtype.
+
+    :param dtype: the dtype to convert to.
+    :param casting: the NumPy casting rule values must follow (see
+                    `numpy.can_cast`). The default 'same_kind' rejects eg.
+                    floats for integers, 'unsafe' truncates them like `int`
+                    but rejects NaN, infinities and values out of range.
+                    Integers may be converted to a narrower integer type
+                    unless casting is 'no', if the values fit in it.
+    '''
+    def __init__(self, dtype, casting='same_kind'):
+        if numpy is None:
+            raise ImportError('coerce requires numpy')
+        self.dtype = numpy.dtype(dtype)
+        self.casting = casting
+
+    def __call__(self, value):
+        return self.validate_array(value).item()
+
+    def validate_array(self, values):
+        try:
+            values = numpy.asarray(values)
+        except OverflowError as exc:
+            raise ValueError('Can not convert values to %s: %s' % (self.dtype, exc))
+        if values.dtype == self.dtype:
+            return values
+        if values.dtype.kind in 'OUS' and self.dtype.kind not in 'OUS':
+            # Strings and objects are parsed, like int('1')
+            try:
+                return values.astype(self.dtype)
+            except (TypeError, ValueError, OverflowError) as exc:
+                raise ValueError('Can not convert values to %s: %s' % (self.dtype, exc))
+        castable = numpy.can_cast(values.dtype, self.dtype, casting=self.casting)
+        if (values.dtype.kind in 'iuf' and self.dtype.kind in 'iu' and self.casting != 'no'
+                and not numpy.can_cast(values.dtype, self.dtype)):
+            if values.dtype.kind == 'f' and not castable:
+                self._not_castable(values)
+            # Narrower integers, and floats if allowed, are fine as long as 
+            # the values fit
+            self._check_fits(values)
+            return values.astype(self.dtype)
+        if castable:
+            return values.astype(self.dtype)
+        self._not_castable(values)
+    
+    def _not_castable(self, values):
+        raise ValueError('Can not convert values of type %s to %s (casting=%r)'
+                         % (values.dtype, self.dtype, self.casting))
+    
+    def _check_fits(self, values):
+        if not values.size:
+            return
+        if values.dtype.kind == 'f':
+            if not numpy.isfinite(values).all():
+                raise ValueError('Can not convert NaN or infinite values to %s' % (self.dtype,))
+            values = numpy.trunc(values)
+        # Python numbers compare exactly
+        info = numpy.iinfo(self.dtype)
+        if values.min().item() < info.min or values.max().item() > info.max:
+            raise ValueError('Values do not fit in %s' % (self.dtype,))
+
+
+class in_range(Validator):
+    '''
+    Check that values are in the closed interval [low, high]. None leaves a
+    side of the interval open.
+
+    :param dtype: convert values to this dtype first (see `coerce`).
+    '''
+    def __init__(self, low=None, high=None, dtype=None, casting='same_kind'):
+        self.low = low
+        self.high = high
+        self._coerce = None if dtype is None else coerce(dtype, casting)
+        self.dtype = None if dtype is None else self._coerce.dtype
+
+    def _out_of_range(self, value):
+        raise ValueError('Value %r is out of range [%r, %r]' % (value, self.low, self.high))
+
+    def __call__(self, value):
+        if self._coerce is not None:
+            value = self._coerce(value)
+        if ((self.low is not None and value < self.low) or
+                (self.high is not None and value > self.high)):
+            self._out_of_range(value)
+        return value
+
+    def validate_array(self, values):
+        if numpy is None:
+            return Validator.validate_array(self, values)
+        if self._coerce is not None:
+            values = self._coerce.validate_array(values)
+        else:
+            values = numpy.asarray(values)
+
+        invalid = numpy.zeros(values.shape, bool)
+        if self.low is not None:
+            invalid |= values < self.low
+        if self.high is not None:
+            invalid |= values > self.high
+        if invalid.any():
+            self._out_of_range(values[invalid].flat[0])
+        return values
+
+
+class instance_of(Validator):
+    '''
+    Check that values are instances of types, like the `instance` argument
+    of `vproperty`. It may be passed as that argument.
+
+    Arrays of a numeric or string dtype are checked by their kind, eg. an
+    array of int32 holds instances of int. Arrays of objects are checked one
+    element at a time.
+    '''
+    def __init__(self, *types):
+        self.types = types
+
+    def __call__(self, value):
+        if not isinstance(value, self.types):
+            raise ValueError('Can not assign value of type %r (expected instance of %r)'
+                             % (type(value), self.types))
+        return value
+
+    def validate_array(self, values):
+        if numpy is None:
+            return Validator.validate_array(self, values)
+        values = numpy.asarray(values)
+        if values.dtype.kind == 'O':
+            for value in values.flat:
+                self(value)
+            return values
+        if not any(values.dtype.kind in KINDS.get(cls, '') for cls in self.types):
+            raise ValueError('Can not assign values of type %s (expected instances of %r)'
+                             % (values.dtype, self.types))
+        return values
+
+
+class elementwise(Validator):
+    '''
+    Validate arrays by calling function for every element. This is what
+    properties with a `type` function that is not a validator do.
+    '''
+    def __init__(self, function, dtype=None):
+        self.function = function
+        self.dtype = dtype
+
+    def __call__(self, value):
+        return self.function(value)
+
+
+class chain(Validator):
+    '''
+    Apply validators one after the other.
+    '''
+    def __init__(self, *validators):
+        self.validators = validators
+        self.dtype = next((validator.dtype for validator in reversed(validators)
+                           if validator.dtype is not None), None)
+
+    def __call__(self, value):
+        for validator in self.validators:
+            value = validator(value)
+        return value
+
+    def validate_array(self, values):
+        for validator in self.validators:
+            values = validator.validate_array(values)
+        return values
+
+
+def array_validator(type=None, instance=None):
+    '''
+    Return a validator for arrays equivalent to the `type` and `instance`
+    arguments of a `vproperty`, or None if they are both None.
+
+    :param type: a `Validator`, a python type (int, float, bool or complex
+                 are converted like `coerce` with 'unsafe' casting) or a
+                 function of one value.
+    :param instance: a type, a tuple of types or an `instance_of` validator.
+    '''
+    validators = []
+    if instance is not None:
+        if not isinstance(instance, instance_of):
+            instance = instance_of(*(instance if isinstance(instance, tuple) else (instance,)))
+        validators.append(instance)
+
+    if isinstance(type, Validator):
+        validators.append(type)
+    elif type in DTYPES and numpy is not None:
+        validators.append(coerce(DTYPES[type], 'unsafe'))
+    elif type is not None:
+        validators.append(elementwise(type, DTYPES.get(type)))
+
+    if not validators:
+        return None
+    if len(validators) == 1:
+        return validators[0]
+    return chain(*validators)
+
@@ -19,23 +19,115 @@ Initializable Properties
 ========================================
 
 Properties that have knowlede of the container class.
+
+Slots
+----------------
+
+Classes may store the values of their properties in `__slots__` instead of 
+the instance `__dict__`::
+
+    @init_properties(slots=True)
+    class Point(object):
+        x = vproperty()
+        y = vproperty()
+
+Slotted classes must be created with the slots, so the decorator returns a new 
+class built from the decorated one. 
 '''
+from types import MemberDescriptorType, FunctionType
+
+#: Functions called with each class once all of its properties are initialized. 
+class_finalizers = []
 
-def init_properties(cls):
+def init_properties(cls=None, slots=False):
     '''
     Class decorator calles __init_property__ on all initializable objects defined in a class
+    and then finalizes the class (see `finalize_class`)
+    
+    :param slots: if True, return a copy of the class with the `__slots__` needed 
+                  by its properties (see `property_slots`). Instances only have 
+                  a `__dict__` if a base class gives them one.  
+    
+    Classes that are already initialized, eg. by the metaclass of 
+    `traity.compat.has_traits.HasTraits`, are returned unchanged.
     '''
+    if cls is None:
+        return lambda cls: init_properties(cls, slots)
+    if '__listener_table__' in cls.__dict__:
+        return cls
+    if slots:
+        cls = _with_slots(cls)
+        
     for key, value in list(cls.__dict__.items()):
         if isinstance(value, initializable):
             value.__init_property__(cls, key)
+    finalize_class(cls)
     return cls
 
+def property_slots(bases, namespace):
+    '''
+    Return the `__slots__` for a class namespace: the slots declared in the 
+    namespace followed by the slots its initializable properties need, 
+    skipping the ones the bases already provide.
+    '''
+    declared = namespace.get('__slots__', ())
+    if isinstance(declared, str):
+        declared = (declared,)
+    slots = list(declared)
+    for key, value in namespace.items():
+        if not isinstance(value, initializable):
+            continue
+        for name in value.__property_slots__(key):
+            if name not in slots and not any(hasattr(base, name) for base in bases):
+                slots.append(name)
+    return tuple(slots)
+
+def _with_slots(cls):
+    namespace = dict(cls.__dict__)
+    namespace['__slots__'] = property_slots(cls.__bases__, namespace)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    for name in namespace['__slots__']:
+        if isinstance(namespace.get(name), MemberDescriptorType):
+            del namespace[name]
+            
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    
+    # Methods using `super()` or `__class__` refer to the class in a closure cell
+    for value in namespace.values():
+        if isinstance(value, (classmethod, staticmethod)):
+            value = value.__func__
+        if not isinstance(value, FunctionType):
+            continue
+        for cell in value.__closure__ or ():
+            try:
+                if cell.cell_contents is cls:
+                    cell.cell_contents = slotted
+            except ValueError:
+                pass
+    return slotted
+
+def finalize_class(cls):
+    '''
+    Call every function in `class_finalizers` with cls. 
+    '''
+    for finalizer in class_finalizers:
+        finalizer(cls)
+
 class initializable(object):
     '''
     
     '''
     def __init_property__(self, cls, key):
         pass
+    
+    def __property_slots__(self, key):
+        '''
+        Names of the slots this property needs when it is stored in a slotted 
+        class under key.
+        '''
+        return ()
 
 class persistent_property(initializable):
     '''
@@ -66,6 +158,9 @@ class persistent_property(initializable):
             return '_%s' %hash(self)
         return self._store_key
     
+    def __property_slots__(self, key):
+        return ('_%s_' % (key),)
+    
     def __init_property__(self, cls, key):
         if self._store_key is not None:
             raise ValueError("can not make persistent, this property already belongs to another class")
@@ -0,0 +1,72 @@
+#-------------------------------------------------------------------------------
+#
+#  Copyright (c) 2011, Enthought, Inc.
+#  All rights reserved.
+#
+#  This software is provided without warranty under the terms of the BSD
+#  license included in /LICENSE.txt and may be redistributed only
+#  under the conditions described in the aforementioned license.  The license
+#  is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+#  Thanks for using Enthought open source!
+#
+#  Author: Sean Ross-Ross
+#
+#-------------------------------------------------------------------------------
+'''
+========================================
+Specialized methods
+========================================
+
+Python looks special methods such as `__get__` and `__set__` up on the type,
+so a descriptor can only get methods of its own through a class of its own.
+`specialize` compiles methods from source and swaps the class of an object
+for a subclass holding them::
+
+    source = """
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.__dict__[key]
+    """
+    specialize(prop, source, {'key': 'x'})
+
+The names used by the source are looked up in the given namespace, so
+constants are bound once instead of being read from the object on each call.
+
+The object becomes the only instance of a new subclass of its class. It is
+still an instance of its class, but checks like `type(obj) is cls` are
+False; use `isinstance` or compare `unspecialized_class(obj)` instead.
+'''
+
+def unspecialized_class(obj):
+    '''
+    Return the class obj had before it was specialized.
+    '''
+    cls = type(obj)
+    return getattr(cls, '__unspecialized__', cls)
+
+def specialize(obj, source, namespace):
+    '''
+    Compile the functions defined in source with namespace as their globals
+    and make them methods of obj only.
+
+    Specializing an object again replaces the previous methods.
+
+    :returns: the new class of obj
+    '''
+    base = unspecialized_class(obj)
+    namespace = dict(namespace)
+    defined = set(namespace)
+    filename = '<specialized %s at %#x>' % (base.__name__, id(obj))
+    exec(compile(source, filename, 'exec'), namespace)
+
+    methods = {key: value for key, value in namespace.items()
+               if key not in defined and key != '__builtins__'}
+    methods['__slots__'] = ()
+    methods['__unspecialized__'] = base
+    methods['__module__'] = base.__module__
+
+    cls = type(base)(base.__name__, (base,), methods)
+    obj.__class__ = cls
+    return cls
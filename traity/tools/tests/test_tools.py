@@ -15,6 +15,7 @@
 #-------------------------------------------------------------------------------
 
 import unittest
+from traity.tools.weak_method import weak_callback
 from traity.tools.initializable_property import persistent_property, \
     init_properties
 
@@ -36,9 +37,35 @@ class Test(unittest.TestCase):
         self.assertEqual(A.p._attr, 'p') 
         self.assertEqual(A.p._store_key, '_p_')
         
+        # Initializing a class again does nothing
+        self.assertIs(init_properties(A), A)
+        self.assertEqual(A.p._store_key, '_p_')
+        
+        class B(object):
+            p = A.p
+            
         with self.assertRaises(ValueError):
-            init_properties(A)
+            init_properties(B)
             
+    def test_weak_callback(self):
+        
+        class A(object):
+            def method(self, value):
+                return self, value
+        
+        dead = []
+        a = A()
+        ref = weak_callback(a.method, dead.append)
+        
+        self.assertEqual(ref(1), (a, 1))
+        self.assertEqual(ref, a.method)
+        self.assertEqual(hash(ref), hash(weak_callback(a.method)))
+        self.assertEqual(ref.resolve(), a.method)
+        
+        del a
+        self.assertFalse(ref.alive)
+        self.assertEqual(dead, [ref])
+        self.assertIsNone(ref(1))
         
 
 
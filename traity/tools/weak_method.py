@@ -7,34 +7,81 @@ import weakref
 from types import MethodType
 
 
-class method_ref(weakref.ref):
+class weak_callback(object):
+    '''
+    A weak reference to a callable that can be called directly.
 
-    def __new__(cls, method):
+    Bound methods keep a weak reference to the instance and a strong reference
+    to the underlying function, so calling does not need to create a bound
+    method. Plain functions and callable objects are referenced weakly.
 
-        if hasattr(method, 'im_self'):
-            return weakref.ref.__new__(cls, method.im_self)
+    Calling a dead weak_callback does nothing and returns None.
+
+    :param target: bound method, function or callable object.
+    :param callback: called with this weak_callback as soon as the target dies.
+    '''
+    __slots__ = ('_ref', '_func', '_hash', '__weakref__')
+
+    def __init__(self, target, callback=None):
+        if isinstance(target, MethodType):
+            obj, func = target.__self__, target.__func__
         else:
-            return weakref.ref.__new__(weakref.ref, method)
+            obj, func = target, None
 
-    def __init__(self, method):
-        super(method_ref, self).__init__(method.im_self)
-        self.im_func = method.im_func
-        self.im_class = method.im_class
+        if callback is None:
+            self._ref = weakref.ref(obj)
+        else:
+            self_ref = weakref.ref(self)
+            def died(_ref):
+                wcb = self_ref()
+                if wcb is not None:
+                    callback(wcb)
+            self._ref = weakref.ref(obj, died)
 
-    def __call__(self):
-        im_self = super(method_ref, self).__call__()
+        self._func = func
+        self._hash = hash((id(obj), id(func)))
 
-        if im_self is None:
+    def __call__(self, *args, **kwargs):
+        obj = self._ref()
+        if obj is None:
             return None
+        if self._func is None:
+            return obj(*args, **kwargs)
+        return self._func(obj, *args, **kwargs)
 
-        return MethodType(self.im_func, im_self, self.im_class)
+    @property
+    def alive(self):
+        return self._ref() is not None
 
-    def __repr__(self):
-        class_name = super(method_ref, self).__call__().__class__.__name__
-        return "<weakref to mthod %r on object %r" % (self.im_func.__name__, class_name)
+    def resolve(self):
+        '''
+        Return the callable this refers to, or None if it has died.
+        '''
+        obj = self._ref()
+        if obj is None or self._func is None:
+            return obj
+        return MethodType(self._func, obj)
 
     def __hash__(self):
-        return hash(self())
+        return self._hash
 
     def __eq__(self, other):
-        return self() == other
+        obj = self._ref()
+        if isinstance(other, weak_callback):
+            if obj is None:
+                return self is other
+            return obj is other._ref() and self._func is other._func
+        if obj is None:
+            return False
+        if isinstance(other, MethodType):
+            return obj is other.__self__ and self._func is other.__func__
+        return self._func is None and obj is other
+
+    def __repr__(self):
+        obj = self._ref()
+        if obj is None:
+            return '<dead weak_callback at %#x>' % id(self)
+        if self._func is None:
+            return '<weak_callback to %r>' % (obj,)
+        return '<weak_callback to method %r of %s object>' % (self._func.__name__,
+                                                            type(obj).__name__)
@@ -22,10 +22,11 @@ Traits = Events + Statics
 '''
 
 from traity.events import events, concat_targets, Event, init_events, disconnect, \
-    connect, listenable
+    connect, listenable, snitch_of, connect_many, disconnect_many, intern_target
 from traity.statics import delegate , vproperty, NoDefault
 import sys
 import weakref
+import inspect
 
 class listenable_trait(listenable):
     '''
@@ -83,6 +84,10 @@ class trait(vproperty, listenable_trait):
         
         listenable_trait.__init__(self)
         
+    def __property_slots__(self, key):
+        return (vproperty.__property_slots__(self, key) + 
+                listenable_trait.__property_slots__(self, key))
+        
     def __init_property__(self, cls, key):
         vproperty.__init_property__(self, cls, key)
         listenable_trait.__init_property__(self, cls, key)
@@ -98,29 +103,76 @@ class trait(vproperty, listenable_trait):
     def __eq__(self, other):
         if isinstance(other, str):
             return self._attr == other
+        elif isinstance(other, trait):
+            # Keep equality transitive: traits with the same name are equal to 
+            # the same string, so they must also be equal to each other.
+            return self is other or (self._attr is not None and self._attr == other._attr)
         else:
             return False
+
      
     def __set__(self, instance, value):
-        try:
+        snitch = events(instance)
+        changed_key = self._target_key('changed')
+        notify = snitch._interested(changed_key)
+        
+        if notify:
             try:
                 old = self._getter(instance)
             except AttributeError:
                 old = NoDefault
+        else:
+            # Nobody is listening: only the stored value is needed to maintain 
+            # connections, so do not create a default value. 
+            old = self._peek(instance)
+            
+        try:
             super(trait, self).__set__(instance, value)
-
         except Exception as exc:
-            self.trigger(instance, 'error', exc=exc)
+            snitch._emit((self, 'error'), {'exc': exc}, key=self._target_key('error'))
             raise 
         
-        self.trigger(instance, 'changed', old=old, new=value)
+        if notify:
+            snitch._emit((self, 'changed'), {'old': old, 'new': value}, key=changed_key)
         
-        if hasattr(old, '__snitch__'):
+        if snitch_of(old) is not None:
             disconnect(instance, old, self)
             
-        if hasattr(value, '__snitch__'):
+        if snitch_of(value) is not None:
             connect(instance, value, self)
 
+    def _set_source(self, namespace):
+        namespace.update(events=events, snitch_of=snitch_of, connect=connect, 
+                         disconnect=disconnect, NoDefault=NoDefault, 
+                         getter=self._getter,
+                         changed_target=(self, 'changed'), 
+                         changed_key=self._target_key('changed'),
+                         error_target=(self, 'error'), 
+                         error_key=self._target_key('error'))
+        
+        lines = ['def __set__(self, instance, value):',
+                 "    snitch = getattr(instance, '__snitch__', None) or events(instance)",
+                 '    notify = snitch._interested(changed_key)',
+                 '    if notify:',
+                 '        try:',
+                 '            old = getter(instance)',
+                 '        except AttributeError:',
+                 '            old = NoDefault',
+                 '    else:']
+        lines += ['        ' + line for line in self._peek_source(namespace)]
+        lines += ['    try:']
+        lines += ['        ' + line for line in self._store_source(namespace)]
+        lines += ['    except Exception as exc:',
+                  "        snitch._emit(error_target, {'exc': exc}, key=error_key)",
+                  '        raise',
+                  '    if notify:',
+                  "        snitch._emit(changed_target, {'old': old, 'new': value}, key=changed_key)",
+                  '    if snitch_of(old) is not None:',
+                  '        disconnect(instance, old, self)',
+                  '    if snitch_of(value) is not None:',
+                  '        connect(instance, value, self)']
+        return lines
+
 class StaticListener(listenable):
     '''
     Storage container for an instance method that is being listened to statically
@@ -169,7 +221,142 @@ def on_change(instance, traits, function, weak=None):
     '''
     target = concat_targets(traits, 'changed')
     events(instance).listen(target, function, weak=weak)
+
+
+#: Target of the compound event triggered by `set_traits`
+traits_changed = ('traits_changed',)
+_traits_changed_key = intern_target(traits_changed)
+
+class TraitValidationError(ValueError):
+    '''
+    Raised by `set_traits` and `set_traits_many` when values are rejected. 
+    
+    :attr errors: list of `(obj, name, exception)` for every rejected value.
+    '''
+    def __init__(self, errors):
+        self.errors = errors
+        names = ', '.join('%s (%s)' % (name, exc) for _, name, exc in errors)
+        ValueError.__init__(self, 'Invalid values for %s' % names)
+
+def on_traits_change(instance, function, weak=None):
+    '''
+    Register a listener to the compound events triggered by `set_traits` on 
+    an object.
+    '''
+    events(instance).listen(traits_changed, function, weak=weak)
+    
+def _writable(obj, name):
+    '''
+    True if setattr can store name on obj: a settable descriptor of its class 
+    or an instance `__dict__`.
+    '''
+    attr = inspect.getattr_static(type(obj), name, None)
+    if isinstance(attr, property):
+        return attr.fset is not None
+    if hasattr(type(attr), '__set__'):
+        return True
+    return hasattr(obj, '__dict__')
+
+def _validate_traits(obj, values, errors):
+    '''
+    Return a list of `(name, property, value, converted value)` for values.  
+    Rejected values are appended to errors.
+    '''
+    cls = type(obj)
+    validated = []
+    for name, value in values.items():
+        prop = getattr(cls, name, None)
+        if not isinstance(prop, vproperty):
+            if _writable(obj, name):
+                validated.append((name, None, value, value))
+            else:
+                errors.append((obj, name, AttributeError('Can not set attribute %r of %r' % (name, cls))))
+            continue
+        try:
+            validated.append((name, prop, value, prop._validate(obj, value)))
+        except Exception as exc:
+            errors.append((obj, name, exc))
+            if isinstance(prop, trait):
+                snitch = events(obj)
+                snitch._emit((prop, 'error'), {'exc': exc}, key=prop._target_key('error'))
+    return validated
+
+def _apply_traits(obj, validated, connections, disconnections):
+    '''
+    Store validated values and trigger the compound changed event, replayed 
+    as one `(name, 'changed')` event per trait for their listeners.
+    '''
+    snitch = events(obj)
+    compound = snitch._interested(_traits_changed_key)
+    changes = []
+    for name, prop, value, new in validated:
+        if prop is None:
+            setattr(obj, name, new)
+            continue
+        if not isinstance(prop, trait):
+            prop._setter(obj, new)
+            continue
+        
+        changed_key = prop._target_key('changed')
+        notify = snitch._interested(changed_key)
+        if compound or notify:
+            try:
+                old = prop._getter(obj)
+            except AttributeError:
+                old = NoDefault
+        else:
+            old = prop._peek(obj)
+        prop._setter(obj, new)
+        changes.append((prop, changed_key, notify, old, value))
+        
+        if snitch_of(old) is not None:
+            disconnections.append((obj, old, prop))
+        if snitch_of(value) is not None:
+            connections.append((obj, value, prop))
     
+    if compound:
+        snitch._emit(traits_changed, 
+                     {'old': {prop._attr: old for prop, _, _, old, _ in changes}, 
+                      'new': {prop._attr: value for prop, _, _, _, value in changes}}, 
+                     key=_traits_changed_key)
+    for prop, changed_key, notify, old, value in changes:
+        if notify:
+            snitch._emit((prop, 'changed'), {'old': old, 'new': value}, key=changed_key)
+
+def set_traits(obj, **values):
+    '''
+    Set several traits (or other attributes) of obj at once::
     
+        set_traits(point, x=1, y=2)
+        
+    All values are validated before any is stored. If some are rejected, or 
+    name attributes that can not be set, `TraitValidationError` lists all of 
+    them and obj is left unchanged. 
+    
+    Then one compound `traits_changed` event is triggered with the `old` and 
+    `new` values as dicts keyed by trait name (see `on_traits_change`). The 
+    usual `(name, 'changed')` events are replayed from it for the traits 
+    that have listeners, after the compound event.
+    '''
+    set_traits_many([(obj, values)])
+
+def set_traits_many(items):
+    '''
+    Like `set_traits` for a sequence of `(obj, values)` pairs. Nothing is 
+    stored unless all values of all objects are valid. The connections to 
+    trait values that have events are updated in one batch 
+    (see `traity.events.connect_many`).
+    '''
+    errors = []
+    validated = [(obj, _validate_traits(obj, values, errors)) for obj, values in items]
+    if errors:
+        raise TraitValidationError(errors)
     
+    connections, disconnections = [], []
+    for obj, values in validated:
+        _apply_traits(obj, values, connections, disconnections)
     
+    if disconnections:
+        disconnect_many(disconnections)
+    if connections:
+        connect_many(connections)
@@ -14,9 +14,13 @@
 #
 #-------------------------------------------------------------------------------
 import unittest
-from traity.traits import trait, on_trait_change, on_change
-from traity.events import init_events, events, global_listener
+import gc
+import weakref
+from traity.traits import trait, on_trait_change, on_change, set_traits, \
+    set_traits_many, on_traits_change, TraitValidationError
+from traity.events import init_events, events, global_listener, connected
 from traity.tools.initializable_property import init_properties
+from traity.compat.has_traits import HasTraits
 
 class Test(unittest.TestCase):
 
@@ -169,6 +173,290 @@ class Test(unittest.TestCase):
         
         self.assertEqual(a.y, 2)
         
+    def test_inherited_static_listeners(self):
+        
+        @init_properties
+        class A(object):
+            seen = ()
+            
+            @on_trait_change('x')
+            def x_changed(self, event):
+                self.seen += ('x',)
+        
+        @init_properties
+        class B(A):
+            @on_trait_change('y')
+            def y_changed(self, event):
+                self.seen += ('y',)
+        
+        b1, b2 = B(), B()
+        init_events(b1, b2)
+        self.assertIs(events(b1)._static, events(b2)._static)
+        self.assertEqual(events(b1)._listeners, {})
+        
+        events(b1).etrigger(('x', 'changed'))
+        events(b1).etrigger(('y', 'changed'))
+        self.assertEqual(b1.seen, ('x', 'y'))
+        self.assertEqual(b2.seen, ())
+        
+    def test_deep_static_listeners(self):
+        
+        @init_properties
+        class A(object):
+            x = trait()
+            
+            @x.changed()
+            def x_changed(self, event):
+                self.seen.append('A.x')
+                
+        @init_properties
+        class B(A):
+            y = trait()
+            
+            @y.changed()
+            def y_changed(self, event):
+                self.seen.append('B.y')
+        
+        class C(B):
+            pass
+        
+        @init_properties
+        class D(C):
+            @on_trait_change('x')
+            def x_changed_again(self, event):
+                self.seen.append('D.x')
+        
+        self.assertEqual(list(A.__listeners__), [('x', 'changed')])
+        self.assertEqual(list(B.__listeners__), [('y', 'changed')])
+        with self.assertRaises(TypeError):
+            D.__listener_table__[0] = ()
+        
+        for cls, expected in [(A, ['A.x']), (B, ['A.x', 'B.y']), 
+                              (C, ['A.x', 'B.y']), (D, ['A.x', 'D.x', 'B.y'])]:
+            obj = cls()
+            obj.seen = []
+            init_events(obj)
+            obj.x = 1
+            obj.y = 1
+            self.assertEqual(obj.seen, expected)
+        
+    def test_slotted_traits(self):
+        
+        class Child(HasTraits, slots=True):
+            x = trait(type=int)
+            
+        class Parent(HasTraits, slots=True):
+            child = trait(instance=Child)
+            seen = trait(fdefault=lambda self: [])
+            
+            @child.x.changed()
+            def child_x_changed(self, event):
+                self.seen.append(event.new)
+        
+        parent, child = Parent(), Child()
+        self.assertFalse(hasattr(parent, '__dict__'))
+        self.assertIs(events(child), child.__snitch__)
+        
+        parent.child = child
+        child.x = 1
+        child.x = '2'
+        self.assertEqual(child.x, 2)
+        self.assertEqual(len(parent.seen), 2)
+        
+    def test_init_kwargs(self):
+        
+        class Plain(HasTraits):
+            x = trait(type=int)
+            
+        class Slotted(HasTraits, slots=True):
+            x = trait(type=int)
+        
+        plain = Plain(x='1', label='a')
+        self.assertEqual((plain.x, plain.label), (1, 'a'))
+        
+        slotted = Slotted(x='2')
+        self.assertEqual(slotted.x, 2)
+        with self.assertRaises(AttributeError):
+            Slotted(label='a')
+        
+    def test_init_properties_twice(self):
+        
+        @init_properties
+        class P(HasTraits):
+            x = trait(type=int)
+        
+        p = P(x='1')
+        self.assertEqual(p.x, 1)
+        self.assertIs(init_properties(P), P)
+        
+    def test_class_value(self):
+        
+        class Kind(HasTraits):
+            pass
+        
+        class Holder(HasTraits):
+            kind = trait()
+        
+        holder = Holder()
+        seen = []
+        events(holder).listen(('kind', 'changed'), seen.append)
+        holder.kind = Kind
+        self.assertIs(holder.kind, Kind)
+        self.assertEqual(len(seen), 1)
+        
+    def test_freed_by_refcount(self):
+        
+        @init_properties
+        class B(object):
+            t = trait()
+            
+            @t.changed()
+            def t_changed(self, event):
+                pass
+            
+        @init_properties
+        class A(object):
+            b = trait(instance=B)
+            
+            @on_trait_change('b')
+            def b_changed(self, event):
+                pass
+            
+        gc.disable()
+        try:
+            a, b = A(), B()
+            init_events(a, b)
+            a.b = b
+            b.t = 1
+            
+            a_ref, b_ref = weakref.ref(a), weakref.ref(b)
+            del a
+            self.assertIsNone(a_ref())
+            del b
+            self.assertIsNone(b_ref())
+        finally:
+            gc.enable()
+        
+    def test_unobserved_set(self):
+        
+        @init_properties
+        class A(object):
+            defaults_created = 0
+            
+            def t_default(self):
+                self.defaults_created += 1
+                return 0
+            
+            t = trait(fdefault=t_default)
+        
+        a = A()
+        init_events(a)
+        a.t = 1
+        self.assertEqual(a.defaults_created, 0)
+        self.assertEqual(a.t, 1)
+        
+        seen = []
+        on_change(a, 't', lambda event: seen.append((event.old, event.new)))
+        a.t = 2
+        self.assertEqual(seen, [(1, 2)])
+        
+    def test_same_name_traits(self):
+        
+        @init_properties
+        class A(object):
+            t = trait()
+            
+        @init_properties
+        class B(object):
+            t = trait()
+            
+        self.assertEqual(A.t, 't')
+        self.assertEqual(A.t, B.t)
+        
+        a, b = A(), B()
+        init_events(a, b)
+        seen = []
+        b.t = 0
+        on_change(a, 't', seen.append)
+        on_change(b, B.t, seen.append)
+        a.t = 1
+        b.t = 2
+        self.assertEqual([event.new for event in seen], [1, 2])
+        
+    def test_set_traits(self):
+        
+        @init_properties
+        class A(object):
+            x = trait(type=int, instance=int)
+            y = trait(type=float)
+            child = trait()
+            
+        a, child = A(), A()
+        init_events(a, child)
+        a.x = 0
+        
+        compound, single = [], []
+        on_traits_change(a, compound.append)
+        on_change(a, 'x', single.append)
+        
+        set_traits(a, x=1, y=2, child=child, label='a')
+        self.assertEqual((a.x, a.y, a.child, a.label), (1, 2.0, child, 'a'))
+        self.assertIs(type(a.y), float)
+        self.assertTrue(connected(a, child))
+        
+        self.assertEqual(len(compound), 1)
+        self.assertEqual(compound[0].old['x'], 0)
+        self.assertEqual(compound[0].new, {'x': 1, 'y': 2, 'child': child})
+        # Replayed for the listeners of x only
+        self.assertEqual([(event.old, event.new) for event in single], [(0, 1)])
+        
+        set_traits(a, child=None)
+        self.assertFalse(connected(a, child))
+        
+    def test_set_traits_invalid(self):
+        
+        @init_properties
+        class A(object):
+            x = trait(instance=int)
+            y = trait(instance=int)
+            z = trait(type=float)
+            
+        a, b = A(), A()
+        init_events(a, b)
+        seen, errors = [], []
+        on_traits_change(a, seen.append)
+        events(a).listen(('y', 'error'), errors.append)
+        
+        with self.assertRaises(TraitValidationError) as context:
+            set_traits(a, x=1, y='1', z='z')
+        self.assertEqual([(obj, name) for obj, name, _ in context.exception.errors], 
+                         [(a, 'y'), (a, 'z')])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(seen, [])
+        self.assertFalse(hasattr(a, 'x'))
+        
+        with self.assertRaises(ValueError):
+            set_traits_many([(a, {'x': 1}), (b, {'x': 1.0})])
+        self.assertFalse(hasattr(a, 'x'))
+        
+        class Slotted(HasTraits, slots=True):
+            x = trait()
+            
+            @property
+            def double(self):
+                return 2 * self.x
+            
+        c = Slotted(x=0)
+        for values in [{'x': 1, 'bogus': 2}, {'x': 1, 'double': 2}]:
+            with self.assertRaises(TraitValidationError) as context:
+                set_traits(c, **values)
+            self.assertIsInstance(context.exception.errors[0][2], AttributeError)
+            self.assertEqual(c.x, 0)
+        
+        set_traits_many([(a, {'x': 1}), (b, {'x': 2, 'z': 3})])
+        self.assertEqual((a.x, b.x, b.z), (1, 2, 3.0))
+        self.assertEqual(len(seen), 1)
+        
     
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']